@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+WebRTC APM 逐帧处理 vs 块处理基准
+
+用法（工程根目录）:
+    python -m benchmarks.bench_apm_block --seconds 60 --frames-per-block 10
+
+单线程运行，按进程 CPU 时间折算每核每秒可处理的 10ms 帧数。
+"""
+import argparse
+import time
+
+import numpy as np
+
+from utils.resource_path import get_webrtc_apm_lib
+from voice.webrtc_apm_lite import WebRtcApmLite
+
+
+def bench_process(apm, audio, bs):
+    t0 = time.process_time()
+    for i in range(0, len(audio) - bs + 1, bs):
+        apm.process(audio[i:i + bs])
+    return time.process_time() - t0
+
+
+def bench_process_block(apm, audio, bs, frames_per_block):
+    block = bs * frames_per_block
+    out = np.zeros(block, dtype=np.int16)
+    t0 = time.process_time()
+    for i in range(0, len(audio) - block + 1, block):
+        apm.process_block(audio[i:i + block], out)
+    return time.process_time() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=60, help="测试音频时长（秒）")
+    parser.add_argument("--frames-per-block", type=int, default=10, help="每次块处理的帧数")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    audio = rng.integers(-3000, 3000, 16000 * args.seconds, dtype=np.int16)
+    apm = WebRtcApmLite(get_webrtc_apm_lib(), 16000)
+    bs = apm.frame_size
+    frames = len(audio) // bs
+    block_frames = len(audio) // (bs * args.frames_per_block) * args.frames_per_block
+
+    cpu = bench_process(apm, audio, bs)
+    print(f"process       {frames / cpu:12.0f} frames/s/core  ({cpu:.3f}s cpu)")
+    cpu = bench_process_block(apm, audio, bs, args.frames_per_block)
+    print(f"process_block {block_frames / cpu:12.0f} frames/s/core  ({cpu:.3f}s cpu)")
+    apm.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+归档格式对比：每小时磁盘占用、编码耗时，以及 opus 解码回放的时长校验
+
+用法（工程根目录）:
+    python -m benchmarks.bench_archive path/to/case.wav [--formats wav flac opus]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+import soundfile
+
+from voice.audio_archive import ARCHIVE_FORMATS, create_archive_writer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--formats", nargs="+", default=list(ARCHIVE_FORMATS))
+    parser.add_argument("--block", type=int, default=1600, help="每次写入的样本数（模拟语音段）")
+    args = parser.parse_args()
+
+    audio, sr = soundfile.read(args.path, dtype="int16")
+    if sr != 16000 or audio.ndim != 1:
+        raise SystemExit("only 16kHz mono wav is supported")
+    seconds = len(audio) / sr
+
+    for fmt in args.formats:
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = create_archive_writer(fmt, tmp, sample_rate=sr)
+            t0 = time.perf_counter()
+            for i in range(0, len(audio), args.block):
+                writer.write(audio[i:i + args.block], "bench")
+            writer.close()
+            elapsed = time.perf_counter() - t0
+
+            path = glob.glob(os.path.join(tmp, "wav", "*"))[0]
+            size = os.path.getsize(path)
+            line = (f"{writer.suffix:5s} {size / seconds * 3600 / 1e6:8.1f} MB/h  "
+                    f"encode {seconds / elapsed:7.1f}x realtime")
+            if writer.suffix == "opus":
+                from voice.opus_codec import read_ogg_opus
+                decoded, _ = read_ogg_opus(path)
+                line += f"  decoded {len(decoded) / sr:.2f}s / {seconds:.2f}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
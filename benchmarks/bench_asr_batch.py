@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+ASR 微批吞吐：同一批整句分别按 batch_size=1 和 batch_size=N 识别，对比段/秒和 RTF
+
+用法（工程根目录，需已下载 funasr 模型；建议用非流式 paraformer）:
+    python -m benchmarks.bench_asr_batch path/to/case.wav [--batch 1 4 8] [--model 模型目录]
+
+模拟积压场景：所有整句一次性就绪，调度器按 max_batch 切批。
+"""
+import argparse
+
+from benchmarks.bench_asr_input import sentences
+from settings import cfg
+from utils.resource_path import get_resource_path
+from voice.asr_batcher import BatchScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 4, 8], help="对比的 max_batch")
+    parser.add_argument("--model", default=None, help="模型目录，默认使用设置中的 funasr 模型")
+    args = parser.parse_args()
+
+    from funasr import AutoModel
+    model_path = args.model or str(get_resource_path(cfg.get("asr", "model_funasr_path")))
+    model = AutoModel(model=model_path, disable_update=True, device=cfg.get("asr", "device"))
+
+    def decode(batch):
+        res = model.generate(input=batch, fs=16000, cache={}, is_final=True, batch_size=len(batch))
+        return [r.get("text", "").strip() for r in res]
+
+    segments = list(sentences(args.path))
+    print(f"{len(segments)} sentences, {sum(map(len, segments)) / 16000:.1f}s speech")
+    decode(segments[:1])  # 预热
+
+    baseline = None
+    for max_batch in args.batch:
+        scheduler = BatchScheduler(decode, max_batch=max_batch)
+        texts = []
+        for i, audio in enumerate(segments):
+            texts += scheduler.add(audio, i)
+        texts += scheduler.flush()
+        assert [ctx for ctx, _ in texts] == list(range(len(segments)))
+        stats = scheduler.stats()
+        baseline = baseline or stats["segments_per_sec"]
+        print(f"max_batch {max_batch:2d}: {stats['segments_per_sec']:6.2f} seg/s  RTF {stats['rtf']:.3f}  "
+              f"avg batch {stats['avg_batch']:.1f}  speedup {stats['segments_per_sec'] / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+ASR 引擎对比：torch（funasr）、onnxruntime int8（onnx）、vosk 的 RTF 和峰值 RSS，
+以及 onnx 与 torch 在固定 WAV 集上的识别结果一致性（字错误率）
+
+用法（工程根目录，需已下载对应模型）:
+    python -m benchmarks.bench_asr_engines a.wav b.wav ... [--engines funasr onnx vosk] [--offline]
+
+每个引擎在独立子进程中加载和识别，RSS 互不影响；默认按流式 600ms 块解码，--offline 整段识别。
+"""
+import argparse
+import json
+import multiprocessing as mp
+import resource
+import sys
+import time
+
+import numpy as np
+import soundfile
+
+CHUNK_STRIDE = 10 * 960
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位 KB，macOS 单位字节
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def _load(engine, streaming):
+    from settings import cfg
+    from utils.resource_path import get_resource_path
+
+    key = "model_onnx_offline_path" if engine == "onnx" and not streaming else f"model_{engine}_path"
+    path = str(get_resource_path(cfg.get("asr", key)))
+    if engine == "funasr":
+        from funasr import AutoModel
+        return AutoModel(model=path, disable_update=True, device=cfg.get("asr", "device"))
+    if engine == "onnx":
+        from voice.onnx_engine import OnnxParaformer
+        return OnnxParaformer(path, streaming, intra_op_threads=cfg.get("asr", "onnx_threads", 4),
+                              quantize=cfg.get("asr", "onnx_quantize", True))
+    import vosk
+    return vosk.Model(path)
+
+
+def _decode(engine, model, audio, streaming) -> str:
+    if engine == "vosk":
+        import vosk
+        rec = vosk.KaldiRecognizer(model, 16000)
+        rec.AcceptWaveform(audio.tobytes())
+        return json.loads(rec.FinalResult()).get("text", "").replace(" ", "")
+    samples = audio.astype(np.float32) / 32768.0
+    if not streaming:
+        return model.generate(input=samples, fs=16000, cache={}, is_final=True, batch_size=1)[0]["text"]
+    chunk_kwargs = dict(chunk_size=[0, 10, 5], encoder_chunk_look_back=4, decoder_chunk_look_back=1)
+    cache, text = {}, ""
+    for i in range(0, len(samples), CHUNK_STRIDE):
+        last = i + CHUNK_STRIDE >= len(samples)
+        res = model.generate(input=samples[i:i + CHUNK_STRIDE], fs=16000, cache=cache,
+                             is_final=last, batch_size=1, **chunk_kwargs)
+        text += res[0]["text"] if res else ""
+    return text
+
+
+def _worker(engine, paths, streaming, out):
+    t0 = time.perf_counter()
+    model = _load(engine, streaming)
+    load_s = time.perf_counter() - t0
+    texts, audio_s, busy_s = [], 0.0, 0.0
+    for path in paths:
+        audio, sr = soundfile.read(path, dtype="int16")
+        if sr != 16000 or audio.ndim != 1:
+            raise SystemExit(f"only 16kHz mono wav is supported: {path}")
+        t0 = time.perf_counter()
+        texts.append(_decode(engine, model, audio, streaming))
+        busy_s += time.perf_counter() - t0
+        audio_s += len(audio) / sr
+    out.put({"texts": texts, "load_s": load_s, "rtf": busy_s / audio_s, "rss_mb": _peak_rss_mb()})
+
+
+def _edit_distance(a: str, b: str) -> int:
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--engines", nargs="+", default=["funasr", "onnx", "vosk"])
+    parser.add_argument("--offline", action="store_true", help="整段识别而非流式分块")
+    parser.add_argument("--max-cer", type=float, default=0.05, help="onnx 相对 torch 允许的字错误率")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for engine in args.engines:
+        out = ctx.Queue()
+        p = ctx.Process(target=_worker, args=(engine, args.paths, not args.offline, out))
+        p.start()
+        results[engine] = out.get()
+        p.join()
+        r = results[engine]
+        print(f"{engine:7s} load {r['load_s']:6.1f}s  RTF {r['rtf']:.3f}  peak RSS {r['rss_mb']:7.0f} MB")
+
+    if "funasr" in results and "onnx" in results:
+        ref, hyp = results["funasr"]["texts"], results["onnx"]["texts"]
+        errors = sum(_edit_distance(r.replace(" ", ""), h.replace(" ", "")) for r, h in zip(ref, hyp))
+        chars = max(1, sum(len(r.replace(" ", "")) for r in ref))
+        for path, r, h in zip(args.paths, ref, hyp):
+            if r != h:
+                print(f"  diff {path}\n    torch: {r}\n    onnx:  {h}")
+        cer = errors / chars
+        print(f"onnx vs torch CER {cer:.2%} ({'PASS' if cer <= args.max_cer else 'FAIL'}, max {args.max_cer:.0%})")
+        if cer > args.max_cer:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
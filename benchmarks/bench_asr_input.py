@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+FunASR 输入方式对比：临时 WAV 文件 vs 内存 float32 数组，每个语音段的识别延迟
+
+用法（工程根目录，需已下载 funasr 模型）:
+    python -m benchmarks.bench_asr_input path/to/case.wav [--repeat 3]
+
+按录音器的端点检测切出整句，逐句分别走两条路径，输出延迟分位数和文本是否一致；
+文件路径在每次识别后删除临时文件，结束时检查没有残留。
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import soundfile
+
+from settings import cfg
+from utils.resource_path import get_resource_path
+from voice.endpointer import segment_wav
+
+
+def sentences(path):
+    parts = []
+    for seg in segment_wav(path):
+        parts.append(seg.audio)
+        if seg.is_final:
+            yield np.concatenate(parts).astype(np.float32) / 32768.0
+            parts = []
+
+
+def via_file(model, audio, tmp_dir):
+    with tempfile.NamedTemporaryFile(suffix=".wav", dir=tmp_dir, delete=False) as tmp:
+        path = tmp.name
+    try:
+        soundfile.write(path, audio, 16000, format="WAV", subtype="PCM_16")
+        return model.generate(input=[path], cache={}, is_final=True, batch_size=1)
+    finally:
+        os.unlink(path)
+
+
+def via_array(model, audio, tmp_dir):
+    return model.generate(input=audio, fs=16000, cache={}, is_final=True, batch_size=1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--repeat", type=int, default=3, help="每句重复次数")
+    args = parser.parse_args()
+
+    from funasr import AutoModel
+    model = AutoModel(model=str(get_resource_path(cfg.get("asr", "model_funasr_path"))),
+                      disable_update=True, device=cfg.get("asr", "device"))
+    segments = list(sentences(args.path))
+    print(f"{len(segments)} sentences, {sum(map(len, segments)) / 16000:.1f}s speech")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 预热一次，避免首句包含模型初始化开销
+        via_array(model, segments[0], tmp_dir)
+        mismatched = 0
+        for name, fn in (("file", via_file), ("array", via_array)):
+            latencies = []
+            for audio in segments:
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    res = fn(model, audio, tmp_dir)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+            ms = np.array(latencies)
+            print(f"{name:5s} p50 {np.percentile(ms, 50):7.1f} ms  p95 {np.percentile(ms, 95):7.1f} ms  "
+                  f"mean {ms.mean():7.1f} ms")
+        for audio in segments:
+            a = via_file(model, audio, tmp_dir)[0]["text"]
+            b = via_array(model, audio, tmp_dir)[0]["text"]
+            mismatched += a != b
+        print(f"text mismatches: {mismatched}/{len(segments)}, leftover temp files: {len(os.listdir(tmp_dir))}")
+
+
+if __name__ == "__main__":
+    main()
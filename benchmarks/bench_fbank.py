@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+fbank 前端对比：FunASR 逐条 extract_fbank 与 model.BatchFbank 一次批量计算的耗时，
+以及两者特征的最大绝对误差（dither 固定为 0 才可比）
+
+用法（工程根目录）:
+    python -m benchmarks.bench_fbank path/to/case.wav [--cmvn am.mvn] [--repeat 5] [--atol 1e-3]
+"""
+import argparse
+import sys
+import time
+
+import torch
+
+from benchmarks.bench_asr_input import sentences
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--cmvn", default=None, help="模型目录下的 am.mvn，可选")
+    parser.add_argument("--lfr", type=int, nargs=2, default=[7, 6], metavar=("M", "N"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--atol", type=float, default=1e-3, help="允许的最大绝对误差")
+    args = parser.parse_args()
+
+    from funasr.frontends.wav_frontend import WavFrontend
+    from funasr.utils.load_utils import extract_fbank
+    from model import BatchFbank
+
+    frontend = WavFrontend(cmvn_file=args.cmvn, fs=16000, window="hamming", n_mels=80, frame_length=25,
+                           frame_shift=10, lfr_m=args.lfr[0], lfr_n=args.lfr[1], dither=0.0)
+    segments = [torch.from_numpy(s) for s in sentences(args.path)]
+    print(f"{len(segments)} sentences, {sum(len(s) for s in segments) / 16000:.1f}s speech")
+
+    def per_item():
+        return [extract_fbank(s, data_type="sound", frontend=frontend, is_final=True)[0][0] for s in segments]
+
+    batch_fbank = BatchFbank(frontend)
+    for name, fn in (("extract_fbank", per_item), ("BatchFbank", lambda: batch_fbank(segments))):
+        fn()  # 预热
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            feats = fn()
+        print(f"{name:14s} {(time.perf_counter() - t0) / args.repeat * 1000:8.2f} ms / batch")
+
+    ref, out = per_item(), batch_fbank(segments)
+    shape_ok = all(a.shape == b.shape for a, b in zip(ref, out))
+    max_diff = max((a - b).abs().max().item() for a, b in zip(ref, out) if a.numel())
+    ok = shape_ok and max_diff <= args.atol
+    print(f"shapes match: {shape_ok}  max abs diff {max_diff:.2e} ({'PASS' if ok else 'FAIL'})")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
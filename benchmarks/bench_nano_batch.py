@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+FunASRNano 批量解码吞吐：同一批整句分别按 batch_size 1/2/4/8 识别（CPU），对比段/秒和 RTF，
+并检查批量结果与逐条结果是否一致
+
+用法（工程根目录，需已下载 Fun-ASR-Nano 模型）:
+    python -m benchmarks.bench_nano_batch model_dir path/to/case.wav [--batch 1 2 4 8] [--limit 16]
+"""
+import argparse
+import time
+
+import torch
+
+from benchmarks.bench_asr_input import sentences
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", help="Fun-ASR-Nano 模型目录")
+    parser.add_argument("path", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 2, 4, 8], help="对比的 batch_size")
+    parser.add_argument("--limit", type=int, default=16, help="最多使用的整句数")
+    parser.add_argument("--threads", type=int, default=0, help="torch 线程数，0 为默认")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    from funasr import AutoModel
+    model = AutoModel(model=args.model, trust_remote_code=True, remote_code="./model.py",
+                      disable_update=True, device="cpu")
+
+    segments = [torch.from_numpy(s) for s in list(sentences(args.path))[:args.limit]]
+    speech_s = sum(len(s) for s in segments) / 16000
+    print(f"{len(segments)} sentences, {speech_s:.1f}s speech, torch threads {torch.get_num_threads()}")
+    model.generate(input=segments[:1], batch_size=1)  # 预热
+
+    baseline = None
+    for batch_size in args.batch:
+        t0 = time.perf_counter()
+        res = model.generate(input=segments, batch_size=batch_size)
+        elapsed = time.perf_counter() - t0
+        texts = [r.get("text", "").strip() for r in res]
+        if baseline is None:
+            baseline = texts
+        diff = sum(a != b for a, b in zip(baseline, texts))
+        print(f"batch {batch_size:2d}: {len(segments) / elapsed:6.2f} seg/s  RTF {elapsed / speech_s:.3f}  "
+              f"differs from first run: {diff}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+FunASRNano 单句额外开销：权重 dtype 已缓存（当前实现）与每次推理前重新转换 LLM 权重（旧实现）
+两种情况下的单句延迟对比
+
+用法（工程根目录，需已下载 Fun-ASR-Nano 模型）:
+    python -m benchmarks.bench_nano_dtype model_dir path/to/case.wav [--dtype fp32|bf16] [--limit 10]
+"""
+import argparse
+import statistics
+import time
+
+import torch
+
+from benchmarks.bench_asr_input import sentences
+
+
+def _latencies(model, segments, llm_dtype, recast):
+    nano = model.model
+    out = []
+    for seg in segments:
+        t0 = time.perf_counter()
+        if recast:
+            # 旧实现：每句都执行一次 self.llm.to(dtype)
+            nano.llm = nano.llm.to(llm_dtype)
+        model.generate(input=[seg], batch_size=1)
+        out.append((time.perf_counter() - t0) * 1000)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", help="Fun-ASR-Nano 模型目录")
+    parser.add_argument("path", help="16kHz 单声道 WAV 文件")
+    parser.add_argument("--dtype", default="fp32", choices=["fp32", "bf16"])
+    parser.add_argument("--limit", type=int, default=10, help="最多使用的整句数")
+    args = parser.parse_args()
+
+    from funasr import AutoModel
+    from model import dtype_map
+    model = AutoModel(model=args.model, trust_remote_code=True, remote_code="./model.py",
+                      disable_update=True, device="cpu", llm_dtype=args.dtype)
+    segments = [torch.from_numpy(s) for s in list(sentences(args.path))[:args.limit]]
+    model.generate(input=segments[:1], batch_size=1)  # 预热，首句完成权重转换
+
+    t0 = time.perf_counter()
+    model.model.llm.to(dtype_map[args.dtype])
+    print(f"llm.to({args.dtype}) on already-cast weights: {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+    for name, recast in (("recast per call", True), ("cached dtype", False)):
+        ms = _latencies(model, segments, dtype_map[args.dtype], recast)
+        print(f"{name:16s} median {statistics.median(ms):8.1f} ms  mean {statistics.mean(ms):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
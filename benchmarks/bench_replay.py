@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+整条录音链路（APM -> VAD -> 端点检测 -> 声纹标签 -> audio_queue）的文件回放吞吐测试
+
+用法（工程根目录，无需声卡）:
+    python -m benchmarks.bench_replay path/to/case.wav [--realtime]
+
+默认尽可能快地回放，输出处理倍速和送出的语音段数；--realtime 按实际时长回放。
+"""
+import argparse
+import queue
+import threading
+import time
+
+from voice.audio_source import FileSource
+from voice.recorder import VoiceRecorder
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", help="16kHz WAV/FLAC 文件（其他采样率会被重采样）")
+    parser.add_argument("--realtime", action="store_true", help="按实时速度回放")
+    args = parser.parse_args()
+
+    audio_queue = queue.Queue(maxsize=10000)
+    segments = []
+    stop_event = threading.Event()
+
+    def consume():
+        while not stop_event.is_set() or not audio_queue.empty():
+            try:
+                block, is_final, speaker = audio_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            segments.append((time.perf_counter(), len(block), is_final))
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+
+    recorder = VoiceRecorder(audio_queue, None)
+    source = FileSource(args.path, realtime=args.realtime)
+    t0 = time.perf_counter()
+    recorder.start(source=source)
+    source.wait()
+    recorder.stop(drain=True)
+    elapsed = time.perf_counter() - t0
+    stop_event.set()
+    consumer.join()
+
+    audio_seconds = source.pushed_samples / 16000
+    speech_seconds = sum(n for _, n, _ in segments) / 16000
+    finals = sum(1 for *_, f in segments if f)
+    print(f"audio {audio_seconds:.1f}s in {elapsed:.2f}s wall -> {audio_seconds / elapsed:.1f}x realtime")
+    print(f"segments {len(segments)} (final {finals}), speech {speech_seconds:.1f}s")
+    print(f"dropped capture frames {recorder.dropped_frames}, queue stats {recorder._sender.stats.snapshot()}")
+
+
+if __name__ == "__main__":
+    main()
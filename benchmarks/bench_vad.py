@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+VAD 引擎基准：各模式每小时音频消耗的 CPU 时间
+
+用法（工程根目录）:
+    python -m benchmarks.bench_vad --seconds 300
+
+合成音频由语音状谐波段、白噪声段和静音段交替组成，按 100ms 块调用 classify。
+"""
+import argparse
+import time
+
+import numpy as np
+
+from voice.vad import VAD_MODES, create_vad
+
+BLOCK = 1600
+
+
+def synth_audio(seconds: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(16000) / 16000
+    parts = []
+    for i in range(seconds):
+        kind = i % 3
+        if kind == 0:
+            f0 = 120 + 40 * rng.random()
+            sig = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6)) * 6000
+        elif kind == 1:
+            sig = rng.normal(0, 800, 16000)
+        else:
+            sig = rng.normal(0, 20, 16000)
+        parts.append(np.clip(sig, -32768, 32767).astype(np.int16))
+    return np.concatenate(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=300, help="测试音频时长（秒）")
+    args = parser.parse_args()
+    audio = synth_audio(args.seconds)
+    blocks = [audio[i:i + BLOCK] for i in range(0, len(audio) - BLOCK + 1, BLOCK)]
+    hours = len(blocks) * BLOCK / 16000 / 3600
+
+    for mode in VAD_MODES:
+        vad = create_vad(mode)
+        t0 = time.process_time()
+        speech = 0
+        for block in blocks:
+            speech += int(vad.classify(block).sum())
+        cpu = time.process_time() - t0
+        ratio = speech / (len(blocks) * BLOCK // 160)
+        print(f"{mode:<8} cpu {cpu / hours:8.2f} s/hour audio | speech frames {ratio:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,7 @@ os.environ['PYTORCH_NO_CUDA_MEMORY_CACHING'] = '1'
 
 import voice.recorder as recorder
 import voice.asr as asr
+import voice.asr_pool as asr_pool
 from ui.app import VoiceApp
 from settings import cfg
 from loguru import logger
@@ -43,13 +44,32 @@ import torch
 if hasattr(torch, 'distributed'):
     torch.distributed.is_available = lambda: False
 
+# 进程名 -> (target, kwargs)，供 monitor_and_restart 按原参数重启（含 ASR 工作进程池）
+proc_specs = {}
+
 def start_process(name, target, kwargs):
     p = Process(target=target, args=(kwargs,), name=name)
     p.daemon = True
     p.start()
+    proc_specs[name] = (target, kwargs)
     logger.info(f"启动子进程: {name} (pid={p.pid})")
     return p
 
+def start_asr_pool(procs, kwargs, workers):
+    """
+    启动 ASR 工作进程池：分发进程从 audio_queue 取段、按序号分给 workers 个工作进程，
+    结果重排后写入 text_queue。每个工作进程各自加载模型。
+    """
+    worker_queues = [Queue(maxsize=cfg.get("process", "audio_queue_size")) for _ in range(workers)]
+    result_queue = Queue(maxsize=cfg.get("process", "text_queue_size"))
+    torch_threads = cfg.get("asr", "torch_threads", 0) or max(1, (os.cpu_count() or workers) // workers)
+    for i, worker_queue in enumerate(worker_queues):
+        worker_kwargs = dict(kwargs, control_queue=None, audio_queue=worker_queue, audio_stats=None,
+                             text_queue=result_queue, torch_threads=torch_threads)
+        procs[f"ASRProcess-{i}"] = start_process(f"ASRProcess-{i}", asr.run, worker_kwargs)
+    dispatch_kwargs = dict(kwargs, control_queue=None, worker_queues=worker_queues, result_queue=result_queue)
+    procs["ASRDispatcher"] = start_process("ASRDispatcher", asr_pool.run, dispatch_kwargs)
+
 def monitor_and_restart(procs_dict, kwargs):
     while True:
         try:
@@ -58,13 +78,11 @@ def monitor_and_restart(procs_dict, kwargs):
                     logger.warning(f"子进程{name}已挂，自动重启中...")
                     proc.terminate()
                     proc.join(timeout=5)
-                    if name == "RecorderProcess":
-                        new_proc = start_process(name, recorder.run, kwargs)
-                    elif name == "ASRProcess":
-                        new_proc = start_process(name, asr.run, kwargs)
-                    else:
+                    if name not in proc_specs:
                         logger.error(f"未知进程名: {name}, 无法重启")
                         continue
+                    target, proc_kwargs = proc_specs[name]
+                    new_proc = start_process(name, target, proc_kwargs)
                     procs_dict[name] = new_proc
             time.sleep(1)
         except Exception as e:
@@ -146,7 +164,26 @@ if __name__ == "__main__":
     # 控制队列：主进程 -> 子进程 发送控制命令
     control_queue = Queue(maxsize=10)
     # 音频队列：Recorder -> ASR 传输音频数据
-    audio_queue = Queue(maxsize=cfg.get("process", "audio_queue_size"))
+    # 优先使用共享内存环形区（只传描述符），失败时回退到普通 Queue
+    audio_queue = None
+    if cfg.get("process", "audio_shm", True):
+        try:
+            from voice.shm_queue import SharedAudioQueue
+            audio_queue = SharedAudioQueue(
+                capacity=16000 * cfg.get("process", "audio_shm_seconds", 60),
+                maxsize=cfg.get("process", "audio_queue_size"),
+            )
+            import atexit
+            atexit.register(audio_queue.close)
+            logger.info("音频队列使用共享内存传输")
+        except Exception as e:
+            logger.warning(f"共享内存音频队列创建失败，回退到Queue: {e}")
+            audio_queue = None
+    if audio_queue is None:
+        audio_queue = Queue(maxsize=cfg.get("process", "audio_queue_size"))
+    # 音频队列统计：入队/丢弃/合并计数和高水位，Recorder、ASR、UI 共享
+    from voice.backpressure import AudioQueueStats
+    audio_stats = AudioQueueStats()
     # 文本队列：ASR -> 主进程 传输识别结果
     text_queue = Queue(maxsize=cfg.get("process", "text_queue_size"))
 
@@ -157,6 +194,7 @@ if __name__ == "__main__":
     kwargs = {
         'control_queue': control_queue,
         'audio_queue': audio_queue,
+        'audio_stats': audio_stats,
         'text_queue': text_queue,
         'audio_send': audio_send,
         'audio_receive': audio_receive,
@@ -170,8 +208,13 @@ if __name__ == "__main__":
 
     # 只有在有模型的情况下才启动ASR进程（语音识别和说话人识别需要模型）
     if 'has_models' in locals() and has_models:
-        procs["ASRProcess"] = start_process("ASRProcess", asr.run, kwargs)
-        logger.info("ASR进程已启动")
+        asr_workers = cfg.get("process", "asr_workers", 1)
+        if asr_workers > 1:
+            start_asr_pool(procs, kwargs, asr_workers)
+            logger.info(f"ASR工作进程池已启动: {asr_workers} 个工作进程")
+        else:
+            procs["ASRProcess"] = start_process("ASRProcess", asr.run, kwargs)
+            logger.info("ASR进程已启动")
     else:
         logger.warning("由于缺少模型或未设置资源路径，不启动ASR进程")
 
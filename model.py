@@ -1,3 +1,4 @@
+import hashlib
 import json
 import logging
 import os
@@ -6,7 +7,10 @@ import re
 import string
 import time
 import traceback
+from collections import OrderedDict
+from contextlib import nullcontext
 
+import numpy as np
 import torch
 import torch.nn as nn
 from funasr import AutoModel
@@ -20,6 +24,216 @@ from transformers import AutoConfig, AutoModelForCausalLM
 dtype_map = {"bf16": torch.bfloat16, "fp16": torch.float16, "fp32": torch.float32}
 
 
+def build_hotword_prompt(hotwords) -> str:
+    """热词列表 -> 提示词前缀（无热词时为空串）"""
+    if len(hotwords) == 0:
+        return ""
+    prompt = f"请结合上下文信息，更加准确地完成语音转写任务。如果没有相关信息，我们会留空。\n\n\n**上下文信息：**\n\n\n"
+    prompt += f"热词列表：[{', '.join(hotwords)}]\n"
+    return prompt
+
+
+def _tensor_bytes(tensor) -> int:
+    return tensor.numel() * tensor.element_size()
+
+
+class EncoderOutputCache:
+    """
+    audio_encoder + audio_adaptor 输出的 LRU 缓存，键为语音特征内容的哈希。
+    同一段音频换热词/语种重解码、或对已保存的会话二次识别时，跳过 encode 和 audio_adaptor。
+    内存占用超过 max_bytes 时淘汰最久未用的条目；设置 spill_dir 时淘汰的条目写到磁盘，
+    之后命中再读回内存，磁盘占用超过 max_spill_bytes 时删除最旧的文件
+    """
+
+    def __init__(self, max_bytes: int = 256 << 20, spill_dir: str = None,
+                 max_spill_bytes: int = 1 << 30):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.spill_bytes = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_bytes = sum(f.stat().st_size for f in os.scandir(spill_dir) if f.is_file())
+
+    @staticmethod
+    def key(waveform, tag: str = "") -> str:
+        """
+        原始采样的内容哈希；tag 为前端参数和编码精度等影响输出的设置。
+        不对 fbank 取哈希：前端开启 dither 时同一段音频每次的特征都不同
+        """
+        waveform = torch.as_tensor(waveform).detach().float().cpu().contiguous()
+        digest = hashlib.sha1(f"{tag}{tuple(waveform.shape)}".encode())
+        digest.update(waveform.numpy().tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        out = self._entries.get(key)
+        if out is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return out
+        out = self._load_spilled(key)
+        if out is not None:
+            self.hits += 1
+            self.disk_hits += 1
+            self.put(key, out)
+            return out
+        self.misses += 1
+        return None
+
+    def put(self, key, out):
+        out = out.detach().cpu()
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= _tensor_bytes(old)
+        self._entries[key] = out
+        self.memory_bytes += _tensor_bytes(out)
+        while self.memory_bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old = self._entries.popitem(last=False)
+            self.memory_bytes -= _tensor_bytes(old)
+            self._spill(old_key, old)
+
+    def _spill_path(self, key) -> str:
+        return os.path.join(self.spill_dir, f"{key}.pt")
+
+    def _spill(self, key, out):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        if os.path.exists(path):
+            return
+        try:
+            torch.save(out, path)
+            self.spill_bytes += os.path.getsize(path)
+        except Exception as e:
+            logging.warning(f"encoder cache spill failed: {e}")
+            return
+        if self.spill_bytes > self.max_spill_bytes:
+            files = sorted(
+                (f for f in os.scandir(self.spill_dir) if f.is_file()),
+                key=lambda f: f.stat().st_mtime,
+            )
+            self.spill_bytes = sum(f.stat().st_size for f in files)
+            for f in files:
+                if self.spill_bytes <= self.max_spill_bytes:
+                    break
+                self.spill_bytes -= f.stat().st_size
+                os.remove(f.path)
+
+    def _load_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return torch.load(path, map_location="cpu")
+        except Exception as e:
+            logging.warning(f"encoder cache load failed: {e}")
+            return None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_bytes": self.memory_bytes,
+            "spill_bytes": self.spill_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class BatchFbank:
+    """
+    向量化的 kaldi fbank：一批内存中的 float32 采样补齐后一次分帧、加窗、FFT 和 mel 投影，
+    窗函数和 mel 矩阵只在构造时计算一次。参数取自 WavFrontend，与逐条 kaldi.fbank 在数值误差内一致，
+    之后按 frontend 配置逐条做 LFR 和 CMVN
+    """
+
+    PREEMPH = 0.97
+
+    def __init__(self, frontend):
+        from torchaudio.compliance.kaldi import get_mel_banks
+
+        self.frontend = frontend
+        fs = frontend.fs
+        self.win_length = int(fs * frontend.frame_length * 0.001)
+        self.hop_length = int(fs * frontend.frame_shift * 0.001)
+        self.n_fft = 1 << (self.win_length - 1).bit_length()
+        self.window = self._window(getattr(frontend, "window", "hamming"), self.win_length)
+        # kaldi 默认 low_freq=20，high_freq=0 即奈奎斯特频率；补上奈奎斯特频点那一列
+        mel, _ = get_mel_banks(frontend.n_mels, self.n_fft, float(fs), 20.0, 0.0, 100.0, -500.0, 1.0)
+        self.mel = torch.nn.functional.pad(mel, (0, 1)).T.contiguous()
+        self.dither = getattr(frontend, "dither", 0.0)
+        self.upscale = getattr(frontend, "upsacle_samples", True)
+        self.eps = torch.finfo(torch.float32).eps
+
+    @staticmethod
+    def supports(frontend) -> bool:
+        return type(frontend).__name__ == "WavFrontend" and getattr(frontend, "snip_edges", True)
+
+    @staticmethod
+    def _window(window_type: str, size: int):
+        if window_type == "hanning":
+            return torch.hann_window(size, periodic=False)
+        if window_type == "hamming":
+            return torch.hamming_window(size, periodic=False, alpha=0.54, beta=0.46)
+        if window_type == "povey":
+            return torch.hann_window(size, periodic=False).pow(0.85)
+        if window_type == "rectangular":
+            return torch.ones(size)
+        raise ValueError(f"unsupported window type: {window_type}")
+
+    def __call__(self, audios) -> list:
+        """audios: 一维 float32 采样（tensor 或 ndarray）列表 -> 每条 [T, d] 特征"""
+        from funasr.frontends.wav_frontend import apply_cmvn, apply_lfr
+
+        waves = [torch.as_tensor(audio, dtype=torch.float32).reshape(-1) for audio in audios]
+        num_frames = [
+            1 + (len(w) - self.win_length) // self.hop_length if len(w) >= self.win_length else 0
+            for w in waves
+        ]
+        x = torch.nn.utils.rnn.pad_sequence(waves, batch_first=True)
+        if x.shape[1] < self.win_length:
+            x = torch.nn.functional.pad(x, (0, self.win_length - x.shape[1]))
+        if self.upscale:
+            x = x * (1 << 15)
+
+        frames = x.unfold(1, self.win_length, self.hop_length)  # [B, F, win]
+        if self.dither != 0.0:
+            frames = frames + self.dither * torch.randn_like(frames)
+        frames = frames - frames.mean(-1, keepdim=True)
+        frames = torch.cat(
+            (
+                frames[..., :1] * (1 - self.PREEMPH),
+                frames[..., 1:] - self.PREEMPH * frames[..., :-1],
+            ),
+            dim=-1,
+        )
+        spectrum = torch.fft.rfft(frames * self.window, n=self.n_fft).abs().pow(2)
+        fbank = torch.matmul(spectrum, self.mel).clamp_min(self.eps).log()
+
+        lfr_m = getattr(self.frontend, "lfr_m", 1)
+        lfr_n = getattr(self.frontend, "lfr_n", 1)
+        cmvn = getattr(self.frontend, "cmvn", None)
+        feats = []
+        for i, n in enumerate(num_frames):
+            feat = fbank[i, :n]
+            if lfr_m != 1 or lfr_n != 1:
+                feat = apply_lfr(feat, lfr_m, lfr_n)
+            if cmvn is not None:
+                feat = apply_cmvn(feat, cmvn)
+            feats.append(feat)
+        return feats
+
+
 @tables.register("model_classes", "FunASRNano")
 class FunASRNano(nn.Module):
     def __init__(
@@ -106,6 +320,12 @@ class FunASRNano(nn.Module):
 
         self.llm_dtype = llm_conf.get("llm_dtype", "fp32")
         self.llm = model.to(dtype_map[self.llm_dtype])
+        # LLM 权重当前的 dtype，推理时只在 dtype 变化时转换一次
+        self.llm_cast_dtype = dtype_map[self.llm_dtype]
+        # 编码器输出缓存，enable_encoder_cache 开启
+        self.encoder_cache = None
+        # 内存音频的向量化 fbank，首次使用时按 frontend 构造
+        self.batch_fbank = None
         llm_dim = model.get_input_embeddings().weight.shape[-1]
 
         # adaptor
@@ -287,8 +507,9 @@ class FunASRNano(nn.Module):
         return contents
 
     def data_load_speech(
-        self, contents: dict, tokenizer, frontend, meta_data={}, **kwargs
+        self, contents: dict, tokenizer, frontend, meta_data={}, speech_feats=None, **kwargs
     ):
+        # speech_feats: precompute_fbank 预先算好的内存音频特征，按出现顺序取用
         system = contents["system"]
         user = contents["user"]
         assistant = contents["assistant"]
@@ -309,6 +530,13 @@ class FunASRNano(nn.Module):
             [],
         )
         input_source_ids = []
+        # 各段语音的编码器缓存键（原始采样哈希），与 fbank 一一对应
+        speech_keys = []
+        cache_tag = (
+            self.encoder_cache_tag(frontend, **kwargs)
+            if self.encoder_cache is not None
+            else None
+        )
         for i, (system_prompt, user_prompt, target_out) in enumerate(
             zip(system, user, assistant)
         ):
@@ -354,24 +582,29 @@ class FunASRNano(nn.Module):
                         sub_str = sub_str[1:]
                         if sub_str.startswith("!"):  # !!: audio sample point
                             sub_str = audio
-                        try:
-                            time1 = time.perf_counter()
-                            data_src = load_audio_text_image_video(
-                                sub_str, fs=frontend.fs, **kwargs
-                            )
+                        if speech_feats and sub_str is audio:
                             time2 = time.perf_counter()
-                            meta_data["load_data"] = f"{time2 - time1:0.3f}"
-                        except Exception as e:
-                            logging.error(
-                                f"Loading wav failed! {str(e)}, {traceback.format_exc()}"
-                            )
-
-                        speech, speech_lengths = extract_fbank(
-                            data_src,
-                            data_type=kwargs.get("data_type", "sound"),
-                            frontend=frontend,
-                            is_final=True,
-                        )  # speech: [b, T, d]
+                            data_src = sub_str
+                            speech, speech_lengths = speech_feats.pop(0)
+                        else:
+                            try:
+                                time1 = time.perf_counter()
+                                data_src = load_audio_text_image_video(
+                                    sub_str, fs=frontend.fs, **kwargs
+                                )
+                                time2 = time.perf_counter()
+                                meta_data["load_data"] = f"{time2 - time1:0.3f}"
+                            except Exception as e:
+                                logging.error(
+                                    f"Loading wav failed! {str(e)}, {traceback.format_exc()}"
+                                )
+
+                            speech, speech_lengths = extract_fbank(
+                                data_src,
+                                data_type=kwargs.get("data_type", "sound"),
+                                frontend=frontend,
+                                is_final=True,
+                            )  # speech: [b, T, d]
 
                         time3 = time.perf_counter()
                         meta_data["extract_feat"] = f"{time3 - time2:0.3f}"
@@ -405,6 +638,8 @@ class FunASRNano(nn.Module):
             if len(speech) > 0:
                 fbank.append(speech[0, :, :])
                 fbank_lens.append(speech_lengths)
+                if cache_tag is not None:
+                    speech_keys.append(self.encoder_cache.key(data_src, cache_tag))
 
         input_ids = torch.tensor(
             input_ids, dtype=torch.int64
@@ -439,6 +674,7 @@ class FunASRNano(nn.Module):
             "labels_ids": labels,
             "source_ids": source_ids[None, :],
             "target_ids": target_ids[None, :],
+            "speech_keys": speech_keys,
         }
 
         return output
@@ -454,12 +690,20 @@ class FunASRNano(nn.Module):
     ):
         meta_data = {}
 
-        if kwargs.get("batch_size", 1) > 1:
-            raise NotImplementedError("batch decoding is not implemented")
+        if len(data_in) > 1:
+            return self.inference_prepare_batch(
+                data_in, tokenizer, frontend, meta_data, **kwargs
+            )
 
+        speech_feats = self.precompute_fbank(data_in[:1], frontend, meta_data, **kwargs)
         contents = self.data_template(data_in[0])
         output = self.data_load_speech(
-            contents, tokenizer, frontend, meta_data=meta_data, **kwargs
+            contents,
+            tokenizer,
+            frontend,
+            meta_data=meta_data,
+            speech_feats=speech_feats[0] if speech_feats else None,
+            **kwargs,
         )
         batch = to_device(output, kwargs["device"])
 
@@ -471,18 +715,11 @@ class FunASRNano(nn.Module):
                 encoder_out = kwargs["audio_embedding"]
                 encoder_out_lens = kwargs["audio_embedding_lens"]
             else:
-                speech_lengths = batch["speech_lengths"][:, 0]
-                # fp16
-                if kwargs.get("fp16", False):
-                    speech = speech.to(torch.float16)
-                elif kwargs.get("bf16", False):
-                    speech = speech.to(torch.bfloat16)
-                # audio encoder
-                encoder_out, encoder_out_lens = self.encode(speech, speech_lengths)
-
-                # audio_adaptor
-                encoder_out, encoder_out_lens = self.audio_adaptor(
-                    encoder_out, encoder_out_lens
+                encoder_out, encoder_out_lens = self.encode_feats(
+                    self.speech_feats(speech, batch["speech_lengths"]),
+                    kwargs["device"],
+                    keys=output["speech_keys"],
+                    **kwargs,
                 )
                 meta_data["audio_adaptor_out"] = encoder_out
                 meta_data["audio_adaptor_out_lens"] = encoder_out_lens
@@ -503,12 +740,126 @@ class FunASRNano(nn.Module):
         fake_token_len[fake_token_len < 0] = 0
         fbank_beg[fbank_beg < 0] = 0
 
+        if len(speech) > 0:
+            self.splice_speech_tokens(
+                inputs_embeds, fbank_beg, fake_token_len, encoder_out, encoder_out_lens
+            )
+        return inputs_embeds, contents, batch, source_ids, meta_data
+
+    def precompute_fbank(self, data_in, frontend, meta_data, **kwargs):
+        """
+        对话中的内存音频（!! 采样点输入）一次向量化计算 fbank，返回每条对话的 [(speech, speech_lengths), ...]；
+        有文件路径输入、frontend 不是 WavFrontend、采样率不一致或 fast_fbank=False 时返回 None，走逐条提取
+        """
+        if not kwargs.get("fast_fbank", True) or not BatchFbank.supports(frontend):
+            return None
+        if kwargs.get("fs", frontend.fs) != frontend.fs:
+            return None
+        audios = []
+        for data in data_in:
+            users = [item for item in data if item["role"] == "user"]
+            if any(item.get("audio") is None for item in users):
+                return None
+            audios.append([item["audio"] for item in users])
+
+        if self.batch_fbank is None or self.batch_fbank.frontend is not frontend:
+            self.batch_fbank = BatchFbank(frontend)
+        time1 = time.perf_counter()
+        feats = iter(self.batch_fbank([audio for item in audios for audio in item]))
+        meta_data["extract_feat"] = f"{time.perf_counter() - time1:0.3f}"
+        return [
+            [
+                (feat[None], torch.tensor([feat.shape[0]], dtype=torch.int32))
+                for feat in (next(feats) for _ in item)
+            ]
+            for item in audios
+        ]
+
+    def enable_encoder_cache(self, max_mb: int = 256, spill_dir: str = None,
+                             max_spill_mb: int = 1024):
+        """开启编码器输出缓存，max_mb 为 0 时关闭"""
+        self.encoder_cache = (
+            EncoderOutputCache(max_mb << 20, spill_dir, max_spill_mb << 20)
+            if max_mb > 0
+            else None
+        )
+        return self.encoder_cache
+
+    def speech_feats(self, speech, speech_lengths) -> list:
+        """data_load_speech 输出的补齐特征 -> 每轮一个去掉补齐的 [T, d] 特征"""
+        feats = []
+        for turn_id in range(len(speech)):
+            feat_len = int(speech_lengths[turn_id, 0].item())
+            feat = speech[turn_id]
+            if self.feat_permute:
+                feat = feat.transpose(0, 1)
+            feats.append(feat[:feat_len])
+        return feats
+
+    def encoder_cache_tag(self, frontend, **kwargs) -> str:
+        """编码器输出缓存键里的设置部分：前端参数和编码精度"""
+        names = ("fs", "window", "n_mels", "frame_length", "frame_shift",
+                 "lfr_m", "lfr_n", "cmvn_file", "upsacle_samples")
+        conf = [getattr(frontend, name, None) for name in names]
+        precision = "fp16" if kwargs.get("fp16", False) else "bf16" if kwargs.get("bf16", False) else "fp32"
+        return f"{conf}{precision}"
+
+    def encode_feats(self, feats, device, keys=None, **kwargs):
+        """
+        多段特征补齐后一起过编码器和 adaptor；
+        开启 encoder_cache 且给出每段的缓存键（data_load_speech 的 speech_keys）时只编码未命中的段
+        """
+        cache = self.encoder_cache if keys else None
+        outs = [None] * len(feats)
+        if cache is not None:
+            outs = [cache.get(k) for k in keys]
+        miss = [i for i, out in enumerate(outs) if out is None]
+        if miss:
+            speech = torch.nn.utils.rnn.pad_sequence(
+                [feats[i] for i in miss], batch_first=True, padding_value=0.0
+            )
+            if self.feat_permute:
+                speech = speech.permute(0, 2, 1)
+            speech_lengths = torch.tensor([len(feats[i]) for i in miss], dtype=torch.int64)
+            encoder_out, encoder_out_lens = self.encode_speech(
+                speech.to(device), speech_lengths.to(device), **kwargs
+            )
+            if cache is None:
+                return encoder_out, encoder_out_lens
+            for j, i in enumerate(miss):
+                # clone：切片是整批输出的视图，直接缓存会让整批张量常驻且 memory_bytes 少算
+                outs[i] = encoder_out[j, : int(encoder_out_lens[j].item())].clone()
+                cache.put(keys[i], outs[i])
+        outs = [out.to(device) for out in outs]
+        encoder_out = torch.nn.utils.rnn.pad_sequence(
+            outs, batch_first=True, padding_value=0.0
+        )
+        encoder_out_lens = torch.tensor([len(out) for out in outs], device=device)
+        return encoder_out, encoder_out_lens
+
+    def encode_speech(self, speech, speech_lengths, **kwargs):
+        # fp16
+        if kwargs.get("fp16", False):
+            speech = speech.to(torch.float16)
+        elif kwargs.get("bf16", False):
+            speech = speech.to(torch.bfloat16)
+        # audio encoder
+        encoder_out, encoder_out_lens = self.encode(speech, speech_lengths)
+
+        # audio_adaptor
+        return self.audio_adaptor(encoder_out, encoder_out_lens)
+
+    def splice_speech_tokens(
+        self, inputs_embeds, fbank_beg, fake_token_len, encoder_out, encoder_out_lens
+    ):
+        """把语音编码输出写入占位 token 的位置，每条/每轮的 fake_token_len 可以不同"""
+        batch_size = inputs_embeds.shape[0]
         speech_idx = 0
         for batch_idx in range(batch_size):
             for turn_id in range(fbank_beg.shape[1]):
-                fbank_beg_idx = fbank_beg[batch_idx, turn_id].item()
+                fbank_beg_idx = int(fbank_beg[batch_idx, turn_id].item())
                 if fbank_beg_idx > 0:
-                    speech_token_len = fake_token_len[batch_idx, turn_id]
+                    speech_token_len = int(fake_token_len[batch_idx, turn_id].item())
                     speech_token = encoder_out[speech_idx, :speech_token_len, :]
 
                     try:
@@ -521,7 +872,7 @@ class FunASRNano(nn.Module):
                         #
                         logging.error(f"{str(e)}, {traceback.format_exc()}")
                         logging.info(
-                            f"batch_idx: {batch_idx}, inputs_embeds: {inputs_embeds.shape}, fbank_beg_idx: {fbank_beg_idx}, speech_token_len: {speech_token_len}, encoder_out: {encoder_out.shape}, encoder_out_lens: {encoder_out_lens}, fake_token_len: {fake_token_len}, speech_lengths: {speech_lengths}"
+                            f"batch_idx: {batch_idx}, inputs_embeds: {inputs_embeds.shape}, fbank_beg_idx: {fbank_beg_idx}, speech_token_len: {speech_token_len}, encoder_out: {encoder_out.shape}, encoder_out_lens: {encoder_out_lens}, fake_token_len: {fake_token_len}"
                         )
                         speech_token_len = encoder_out_lens[speech_idx].item()
                         speech_token = encoder_out[speech_idx, :speech_token_len, :]
@@ -532,7 +883,90 @@ class FunASRNano(nn.Module):
                         ] = speech_token
 
                     speech_idx += 1
-        return inputs_embeds, contents, batch, source_ids, meta_data
+        return inputs_embeds
+
+    def inference_prepare_batch(
+        self, data_in, tokenizer, frontend, meta_data, **kwargs
+    ):
+        """
+        多条语音一次前向：
+        各条的语音特征补齐后一起过编码器；prompt 左侧补齐到同一长度（decoder-only 生成要求右对齐），
+        attention_mask 屏蔽补齐位置，语音占位的起点随补齐长度平移
+        """
+        if kwargs.get("tearchforing", False) or kwargs.get("teachforing", False):
+            # 教师强制按单条的 labels_ids 计算 loss，批量输入请逐条调用
+            raise ValueError(
+                f"teacher forcing takes one utterance per call, got {len(data_in)}; "
+                "call inference with batch_size=1"
+            )
+
+        speech_feats = self.precompute_fbank(data_in, frontend, meta_data, **kwargs)
+        contents, items = [], []
+        for i, data in enumerate(data_in):
+            contents.append(self.data_template(data))
+            items.append(
+                self.data_load_speech(
+                    contents[-1],
+                    tokenizer,
+                    frontend,
+                    meta_data=meta_data,
+                    speech_feats=speech_feats[i] if speech_feats else None,
+                    **kwargs,
+                )
+            )
+
+        # 语音特征按条、按轮展开成 [T, d]，顺序与 splice_speech_tokens 的遍历一致
+        feats, keys = [], []
+        for item in items:
+            if len(item["speech"]) > 0:
+                feats += self.speech_feats(item["speech"], item["speech_lengths"])
+                keys += item["speech_keys"]
+
+        device = kwargs["device"]
+        encoder_out = encoder_out_lens = None
+        if feats:
+            encoder_out, encoder_out_lens = self.encode_feats(
+                feats, device, keys=keys if len(keys) == len(feats) else None, **kwargs
+            )
+            meta_data["audio_adaptor_out"] = encoder_out
+            meta_data["audio_adaptor_out_lens"] = encoder_out_lens
+            meta_data["batch_data_time"] = (
+                sum(len(feat) for feat in feats) * frontend.frame_shift * frontend.lfr_n / 1000
+            )
+
+        batch_size = len(items)
+        max_len = max(item["source_ids"].shape[1] for item in items)
+        max_turns = max(item["fbank_beg"].shape[1] for item in items)
+        input_ids = torch.zeros(batch_size, max_len, dtype=torch.int64)
+        attention_mask = torch.zeros(batch_size, max_len, dtype=torch.int64)
+        fbank_beg = torch.zeros(batch_size, max_turns, dtype=torch.int32)
+        fake_token_len = torch.zeros(batch_size, max_turns, dtype=torch.int32)
+        for batch_idx, item in enumerate(items):
+            ids = item["source_ids"][0].clamp(min=0)
+            offset = max_len - len(ids)
+            input_ids[batch_idx, offset:] = ids
+            attention_mask[batch_idx, offset:] = 1
+            token_len = item["fake_token_len"][0].clamp(min=0)
+            turns = len(token_len)
+            has_speech = token_len > 0
+            fake_token_len[batch_idx, :turns] = token_len
+            fbank_beg[batch_idx, :turns] = torch.where(
+                has_speech, item["fbank_beg"][0] + offset, torch.zeros_like(token_len)
+            )
+
+        input_ids = input_ids.to(device)
+        inputs_embeds = self.llm.model.get_input_embeddings()(input_ids)
+        if encoder_out is not None:
+            self.splice_speech_tokens(
+                inputs_embeds, fbank_beg, fake_token_len, encoder_out, encoder_out_lens
+            )
+        batch = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask.to(device),
+            "fbank_beg": fbank_beg,
+            "fake_token_len": fake_token_len,
+        }
+        return inputs_embeds, contents, batch, input_ids, meta_data
 
     def inference(
         self,
@@ -543,13 +977,31 @@ class FunASRNano(nn.Module):
         frontend=None,
         **kwargs,
     ):
-        hotwords = kwargs.get("hotwords", [])
-        if len(hotwords) > 0:
-            hotwords = ", ".join(hotwords)
-            prompt = f"请结合上下文信息，更加准确地完成语音转写任务。如果没有相关信息，我们会留空。\n\n\n**上下文信息：**\n\n\n"
-            prompt += f"热词列表：[{hotwords}]\n"
-        else:
-            prompt = ""
+        data_in = self.build_data_in(data_in, **kwargs)
+
+        if key is None:
+            key = []
+            for _ in data_in:
+                chars = string.ascii_letters + string.digits
+                key.append(
+                    "rand_key_" + "".join(random.choice(chars) for _ in range(13))
+                )
+
+        return self.inference_llm(
+            data_in,
+            data_lengths=data_lengths,
+            key=key,
+            tokenizer=tokenizer,
+            frontend=frontend,
+            **kwargs,
+        )
+
+    def build_data_in(self, data_in, **kwargs):
+        """音频路径/采样点 -> 对话格式的输入（含热词和语种提示）"""
+        # hotword_prompt 为调用方缓存的已编译热词前缀，避免每段重新拼接
+        prompt = kwargs.get("hotword_prompt")
+        if prompt is None:
+            prompt = build_hotword_prompt(kwargs.get("hotwords", []))
         language = kwargs.get("language", "auto")
         if language not in ("auto", "zh", "en", "ja"):
             language = "auto"
@@ -565,6 +1017,8 @@ class FunASRNano(nn.Module):
 
         new_data_in = []
         for data in data_in:
+            if isinstance(data, np.ndarray):
+                data = torch.from_numpy(data)
             if isinstance(data, str):
                 new_data_in.append(
                     [
@@ -588,24 +1042,80 @@ class FunASRNano(nn.Module):
                         {"role": "assistant", "content": "null"},
                     ]
                 )
-        data_in = new_data_in
+        return new_data_in
 
-        if key is None:
-            key = []
-            for _ in data_in:
-                chars = string.ascii_letters + string.digits
-                key.append(
-                    "rand_key_" + "".join(random.choice(chars) for _ in range(13))
-                )
+    def inference_stream(
+        self,
+        data_in,
+        data_lengths=None,
+        key: list = None,
+        tokenizer=None,
+        frontend=None,
+        **kwargs,
+    ):
+        """
+        流式输出（单条输入）：LLM 在后台线程生成，每解出一段文本就 yield 一次当前累计的结果，
+        生成到 <|im_end|> 等结束符即停止
+        """
+        from threading import Thread
 
-        return self.inference_llm(
-            data_in,
-            data_lengths=data_lengths,
-            key=key,
-            tokenizer=tokenizer,
-            frontend=frontend,
-            **kwargs,
+        from transformers import TextIteratorStreamer
+
+        data_in = self.build_data_in(data_in[:1], **kwargs)
+        # 编码器和 adaptor 同样不需要梯度，否则每句都会建立并保留计算图
+        with torch.no_grad():
+            inputs_embeds, contents, batch, source_ids, meta_data = self.inference_prepare(
+                data_in, data_lengths, key, tokenizer, frontend, **kwargs
+            )
+        device_type = inputs_embeds.device.type
+        llm_dtype = self.resolve_llm_dtype(device_type, **kwargs)
+        self.prepare_llm(llm_dtype)
+        if inputs_embeds.dtype != dtype_map[llm_dtype]:
+            inputs_embeds = inputs_embeds.to(dtype_map[llm_dtype])
+
+        streamer = TextIteratorStreamer(
+            tokenizer,
+            skip_prompt=True,
+            timeout=kwargs.get("stream_timeout", 60),
+            skip_special_tokens=kwargs.get("skip_special_tokens", True),
         )
+        generate_kwargs = dict(kwargs.get("llm_kwargs", {}))
+        generate_kwargs.setdefault("eos_token_id", self.stop_token_ids(tokenizer))
+
+        def generate():
+            # no_grad 和 autocast 都是线程内状态，需在生成线程里设置
+            try:
+                with torch.no_grad(), self.llm_autocast(device_type, llm_dtype):
+                    self.llm.generate(
+                        inputs_embeds=inputs_embeds,
+                        max_new_tokens=kwargs.get("max_length", 512),
+                        streamer=streamer,
+                        **generate_kwargs,
+                    )
+            except Exception as e:
+                logging.error(f"{str(e)}, {traceback.format_exc()}")
+                streamer.end()
+
+        thread = Thread(target=generate, daemon=True)
+        thread.start()
+        text = ""
+        for piece in streamer:
+            if piece:
+                text += piece
+                yield re.sub(r"\s+", " ", text.replace("/sil", " "))
+        thread.join()
+
+    @staticmethod
+    def stop_token_ids(tokenizer) -> list:
+        """生成结束符：<|im_end|>、<|endoftext|> 和 tokenizer 的 eos"""
+        ids = set()
+        if tokenizer.eos_token_id is not None:
+            ids.add(tokenizer.eos_token_id)
+        for token in ("<|im_end|>", "<|endoftext|>"):
+            token_id = tokenizer.convert_tokens_to_ids(token)
+            if isinstance(token_id, int) and token_id != tokenizer.unk_token_id:
+                ids.add(token_id)
+        return sorted(ids)
 
     def inference_llm(
         self,
@@ -619,29 +1129,37 @@ class FunASRNano(nn.Module):
         inputs_embeds, contents, batch, source_ids, meta_data = self.inference_prepare(
             data_in, data_lengths, key, tokenizer, frontend, **kwargs
         )
-        llm_dtype = kwargs.get("llm_dtype", "fp32")
-        if llm_dtype == "fp32":
-            llm_dtype = "fp16" if kwargs.get("fp16", False) else llm_dtype
-            llm_dtype = "bf16" if kwargs.get("bf16", False) else llm_dtype
-
-        with torch.cuda.amp.autocast(
-            enabled=True if llm_dtype != "fp32" else False, dtype=dtype_map[llm_dtype]
-        ):
-            label = contents["assistant"][-1]
-            self.llm = self.llm.to(dtype_map[llm_dtype])
-            inputs_embeds = inputs_embeds.to(dtype_map[llm_dtype])
+        device_type = inputs_embeds.device.type
+        llm_dtype = self.resolve_llm_dtype(device_type, **kwargs)
+        self.prepare_llm(llm_dtype)
+
+        # 批量时 contents 为每条的列表
+        contents_list = contents if isinstance(contents, list) else [contents]
+        with self.llm_autocast(device_type, llm_dtype):
+            labels = [c["assistant"][-1] for c in contents_list]
+            if inputs_embeds.dtype != dtype_map[llm_dtype]:
+                inputs_embeds = inputs_embeds.to(dtype_map[llm_dtype])
             llm_kwargs = kwargs.get("llm_kwargs", {})
             if not kwargs.get("teachforing", False):
+                generate_kwargs = dict(llm_kwargs)
+                generate_kwargs.setdefault("eos_token_id", self.stop_token_ids(tokenizer))
+                if len(contents_list) > 1:
+                    # 左侧补齐的批次：mask 掉补齐位置，生成结束的条目用 pad 填充
+                    generate_kwargs["attention_mask"] = batch["attention_mask"]
+                    if tokenizer.pad_token_id is not None:
+                        generate_kwargs.setdefault("pad_token_id", tokenizer.pad_token_id)
+                    else:
+                        generate_kwargs.setdefault("pad_token_id", tokenizer.eos_token_id)
                 generated_ids = self.llm.generate(
                     inputs_embeds=inputs_embeds,
                     max_new_tokens=kwargs.get("max_length", 512),
-                    **llm_kwargs,
+                    **generate_kwargs,
                 )
 
-                response = tokenizer.batch_decode(
+                responses = tokenizer.batch_decode(
                     generated_ids,
                     skip_special_tokens=kwargs.get("skip_special_tokens", True),
-                )[0]
+                )
 
                 loss = None
             else:
@@ -656,11 +1174,11 @@ class FunASRNano(nn.Module):
                 )
 
                 preds = torch.argmax(model_outputs.logits, -1)[:, source_ids.shape[1] :]
-                response = tokenizer.batch_decode(
+                responses = tokenizer.batch_decode(
                     preds,
                     add_special_tokens=False,
                     skip_special_tokens=kwargs.get("skip_special_tokens", True),
-                )[0]
+                )[:1]
                 loss = model_outputs.loss.item()
 
         ibest_writer = None
@@ -670,24 +1188,52 @@ class FunASRNano(nn.Module):
             ibest_writer = self.writer[f"{0 + 1}best_recog"]
 
         results = []
-        response_clean = re.sub(r"[^\w\s\u3000\u4e00-\u9fff]+", "", response)
-        result_i = {
-            "key": key[0],
-            "text": re.sub(r'\s+', ' ', response.replace("/sil", " ")),
-            "text_tn": response_clean,
-            "label": label,
-        }
-        if loss is not None:
-            result_i["loss"] = loss
-        results.append(result_i)
-
-        if ibest_writer is not None:
-            ibest_writer["text"][key[0]] = response.replace("\n", " ")
-            ibest_writer["label"][key[0]] = label.replace("\n", " ")
-            ibest_writer["text_tn"][key[0]] = response_clean
+        for i, (response, label) in enumerate(zip(responses, labels)):
+            response_clean = re.sub(r"[^\w\s\u3000\u4e00-\u9fff]+", "", response)
+            result_i = {
+                "key": key[i],
+                "text": re.sub(r'\s+', ' ', response.replace("/sil", " ")),
+                "text_tn": response_clean,
+                "label": label,
+            }
+            if loss is not None:
+                result_i["loss"] = loss
+            results.append(result_i)
+
+            if ibest_writer is not None:
+                ibest_writer["text"][key[i]] = response.replace("\n", " ")
+                ibest_writer["label"][key[i]] = label.replace("\n", " ")
+                ibest_writer["text_tn"][key[i]] = response_clean
 
         return results, meta_data
 
+    @staticmethod
+    def resolve_llm_dtype(device_type: str = "cpu", **kwargs) -> str:
+        """推理用的 LLM dtype；CPU 不支持 fp16 autocast，改用 bf16（CPU 不支持 bf16 时退回 fp32）"""
+        llm_dtype = kwargs.get("llm_dtype", "fp32")
+        if llm_dtype == "fp32":
+            llm_dtype = "fp16" if kwargs.get("fp16", False) else llm_dtype
+            llm_dtype = "bf16" if kwargs.get("bf16", False) else llm_dtype
+        if device_type == "cpu" and llm_dtype != "fp32":
+            is_bf16_supported = getattr(torch.cpu, "is_bf16_supported", lambda: True)
+            llm_dtype = "bf16" if is_bf16_supported() else "fp32"
+        return llm_dtype
+
+    def prepare_llm(self, llm_dtype: str):
+        """把 LLM 权重转换到 llm_dtype，已是该 dtype 时不做任何事"""
+        dtype = dtype_map[llm_dtype]
+        if self.llm_cast_dtype != dtype:
+            self.llm = self.llm.to(dtype)
+            self.llm_cast_dtype = dtype
+            logging.info(f"llm weights cast to {llm_dtype}")
+
+    @staticmethod
+    def llm_autocast(device_type: str, llm_dtype: str):
+        """fp32 不进 autocast；CUDA 用 fp16/bf16 autocast，CPU 用 bf16 autocast"""
+        if llm_dtype == "fp32" or device_type not in ("cuda", "cpu"):
+            return nullcontext()
+        return torch.autocast(device_type=device_type, dtype=dtype_map[llm_dtype])
+
     @staticmethod
     def from_pretrained(model: str = None, **kwargs):
         from funasr import AutoModel
@@ -695,5 +1241,8 @@ class FunASRNano(nn.Module):
         model, kwargs = AutoModel.build_model(
             model=model, trust_remote_code=True, **kwargs
         )
+        # 加载时按推理 dtype 转换一次 LLM 权重，之后每次推理不再转换
+        device_type = torch.device(kwargs.get("device", "cpu")).type
+        model.prepare_llm(model.resolve_llm_dtype(device_type, **kwargs))
 
         return model, kwargs
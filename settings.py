@@ -15,18 +15,75 @@ DEFAULT_CONFIG = {
         "save_dir": "",
         "resource_dir": ""
     },
-    "input_device": {},
+    "input_device": {
+        # 多诊室录音：[{"id": "诊室1", "device": 1, "channel": 0}, ...]，为空时单路录音
+        "rooms": []
+    },
     "output_device": {},
     "asr": {
         "denoise": True,
         "model":"vosk",
         "model_funasr_path": ".cache/shuai1618/paraformer-zh-streaming",
         "model_vosk_path": ".cache/shuai1618/vosk-model-small-cn",
-        "device":"mps"
+        # onnx 引擎与 funasr 共用模型目录，首次使用时导出 model_quant.onnx
+        "model_onnx_path": ".cache/shuai1618/paraformer-zh-streaming",
+        # onnx 引擎关闭 streaming 时使用的离线 paraformer
+        "model_onnx_offline_path": ".cache/iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-pytorch",
+        "model_nano_path": ".cache/FunAudioLLM/Fun-ASR-Nano-2512",
+        # nano 引擎边生成边发 partial（关闭后整句合批识别）
+        "nano_stream_tokens": True,
+        # nano 编码器输出的内存缓存上限（MB，0 为关闭），设置目录时淘汰的条目落盘
+        "nano_encoder_cache_mb": 256,
+        "nano_encoder_cache_dir": "",
+        "onnx_threads": 4,
+        "onnx_quantize": True,
+        "device":"mps",
+        "vad_mode": "webrtc",
+        "vad_aggressiveness": 1,
+        # funasr/onnx 流式 paraformer 按 600ms 块解码并发出 partial
+        "streaming": True,
+        # 非流式整句识别的微批：单批最大段数、首段最多等待毫秒数；仅离线 paraformer 和 nano 生效
+        "batch_size": 8,
+        "batch_wait_ms": 50,
+        # 每个 ASR 进程的 torch 线程数，0 为默认（工作进程池时按核数均分）
+        "torch_threads": 0,
+        # 启动时用合成语音段预热模型，并记录冷/热首句延迟
+        "warmup": True,
+        # vosk 实时 partial 的最高发送频率（次/秒），0 为关闭
+        "partial_rate_hz": 5,
+        # 诊所热词（品种、药名、检查项目），另可指定每行一个词的热词文件
+        "hotwords": ["柯基", "布偶猫", "金毛", "泰迪", "英短", "血常规", "生化", "犬瘟", "细小",
+                     "猫瘟", "驱虫", "绝育", "耳螨", "皮炎", "阿莫西林", "美洛昔康", "头孢"],
+        "hotword_file": "",
+        # vosk 用热词作 grammar，会限制词表，仅适合固定指令场景
+        "vosk_grammar": False
     },
     "process": {
         "audio_queue_size": 100,
-        "text_queue_size": 100
+        "text_queue_size": 100,
+        "audio_shm": True,
+        "audio_shm_seconds": 60,
+        "backpressure_policy": "drop_oldest",
+        "backlog_size": 20,
+        "high_watermark": 0.8,
+        # ASR 工作进程数，>1 时启动分发进程 + 工作进程池；分发方式 stream / round_robin
+        "asr_workers": 1,
+        "asr_dispatch": "stream"
+    },
+    "endpoint": {
+        "partial_silence_frames": 10,
+        "final_silence_frames": 20,
+        "min_final_silence_frames": 6,
+        "decay_seconds": 10,
+        "max_segment_seconds": 15,
+        "preroll_ms": 200,
+        "stream_chunk_ms": 0
+    },
+    "archive": {
+        # wav / flac / opus
+        "format": "opus",
+        "rotate_seconds": 1800,
+        "rotate_mb": 200
     },
         
     "spk": {
@@ -28,6 +28,7 @@ class VoiceApp(QWidget):
         self.audio_queue = kwargs['audio_queue']
         self.text_queue = kwargs['text_queue']
         self.audio_receive = kwargs.get('audio_receive', None)
+        self.audio_stats = kwargs.get('audio_stats', None)
         self._is_recording = False
         self.llm_manager = case.llm.LLMManager()
         #ui
@@ -40,7 +41,7 @@ class VoiceApp(QWidget):
         self.form_panel.case_selector.installEventFilter(self)
         # ---------- 右侧 BT + ASR + LLM 区域 ----------
         self.bt_panel= ui.components.bt_panel.BTPanel()
-        self.asr_panel=ui.components.asr_panel.ASRPanel(self.text_queue,self.llm_manager,self.audio_receive)
+        self.asr_panel=ui.components.asr_panel.ASRPanel(self.text_queue,self.llm_manager,self.audio_receive,self.audio_stats)
         self.llm_panel = ui.components.llm_panel.LLMPanel(self.llm_manager,self.form_panel)
 
         # 连接病历保存信号
@@ -151,7 +152,7 @@ class VoiceApp(QWidget):
     def case_selected(self, index):
         if index < 0:
             return
-        self.asr_panel.text_browser.clear()
+        self.asr_panel.clear_dialogues()
         dialogue = self.form_panel.load(index)
         if dialogue:
             json_data = json.loads(dialogue)
@@ -4,16 +4,23 @@ from ui.waveview import WaveformWidget
 import sounddevice as sd
 from settings import cfg
 from PySide6.QtCore import Qt, QTimer,QEvent
+from PySide6.QtGui import QTextCursor
 from loguru import logger
 import json
 import case.llm
 from pathlib import Path
 class ASRPanel(QWidget):
-    def __init__(self, text_queue, llm_manager:case.llm.LLMManager, audio_receive=None):
+    def __init__(self, text_queue, llm_manager:case.llm.LLMManager, audio_receive=None, audio_stats=None):
         super().__init__()
         self.audio_receive = audio_receive
+        self.audio_stats = audio_stats
         self.text_queue = text_queue
         self.llm_manager=llm_manager
+        # 流式识别的 partial：stream -> (speaker, text, seq)，显示在对话末尾，final 到达后替换
+        # 工作进程池模式下消息带句子序号，final 只清除同一句或更早句子的 partial
+        self._partials = {}
+        self._final_seq = {}
+        self._partial_pos = None
         self.setup_ui()
         self.timer = QTimer()
         self.timer.timeout.connect(self.poll_text_queue)
@@ -89,7 +96,19 @@ class ASRPanel(QWidget):
         layout.addWidget(view_widget)
 
         # 对话内容
-        layout.addWidget(QLabel("对话内容："))
+        title_layout = QHBoxLayout()
+        title_layout.addWidget(QLabel("对话内容："))
+        # 识别积压提示：audio_queue 达到高水位时显示
+        self.backlog_label = QLabel()
+        self.backlog_label.setStyleSheet("color: #FF8C00;")
+        self.backlog_label.hide()
+        title_layout.addWidget(self.backlog_label)
+        # ASR 进程状态：加载中 / 就绪（含预热耗时）/ 失败
+        self.asr_status_label = QLabel()
+        self.asr_status_label.setStyleSheet("color: #808080;")
+        title_layout.addWidget(self.asr_status_label)
+        title_layout.addStretch()
+        layout.addLayout(title_layout)
         self.text_browser = QTextBrowser()
         self.text_browser.setAlignment(Qt.AlignLeft)
         layout.addWidget(self.text_browser)
@@ -123,17 +142,56 @@ class ASRPanel(QWidget):
                 self.output_device.setCurrentIndex(selected_output_device)
             else:
                 self.output_device.setCurrentIndex(self.output_device.count() - 1)
+    def update_backlog_label(self):
+        if self.audio_stats is None:
+            return
+        stats = self.audio_stats.snapshot()
+        if stats["high_watermark"] or stats["dropped"]:
+            self.backlog_label.setText(
+                f"⚠️ 识别积压 {stats['depth'] + stats['backlog']} 段，已丢弃 {stats['dropped']}，合并 {stats['merged']}"
+            )
+            self.backlog_label.show()
+        else:
+            self.backlog_label.hide()
+
+    def update_asr_status(self, data):
+        status = data["status"]
+        if status == "loading":
+            self.asr_status_label.setText("⏳ 识别模型加载中…")
+        elif status == "ready":
+            text = f"✅ 识别就绪（{data.get('model', '')}"
+            if "warm_ms" in data:
+                text += f"，首句 {data['warm_ms']} ms"
+            self.asr_status_label.setText(text + "）")
+            logger.info(f"ASR 就绪: {data}")
+        else:
+            self.asr_status_label.setText("❌ 识别模型加载失败，请在设置中检查模型")
+
     def poll_text_queue(self):
+        self.update_backlog_label()
+        if self.text_queue.empty():
+            return
+        self._clear_partials()
         try:
             while not self.text_queue.empty():
                 item = self.text_queue.get_nowait()
+                stream = None
+                partial = False
+                seq = None
 
                 # 假设 item 是 JSON 字符串，如 {"speaker": "A", "text": "你好"}
                 if isinstance(item, str):
                     try:
                         data = json.loads(item)
+                        if "status" in data:
+                            self.update_asr_status(data)
+                            continue
                         speaker = data.get("speaker", "用户")
                         text = data.get("text", "")
+                        # 多诊室输入时标记来源
+                        stream = data.get("stream")
+                        partial = data.get("partial", False)
+                        seq = data.get("seq")
 
                         # 标准化speaker名称
                         if speaker.lower() in ["unknown", "unkonw"]:
@@ -147,7 +205,18 @@ class ASRPanel(QWidget):
                     speaker = "用户"
                     text = str(item)
 
-                self.append_dialogue(speaker, text)
+                if partial:
+                    if not self._is_stale(stream, seq):
+                        self._partials[stream] = (speaker, text, seq)
+                    continue
+                current = self._partials.get(stream)
+                if seq is None or current is None or current[2] is None or current[2] <= seq:
+                    self._partials.pop(stream, None)
+                if seq is not None:
+                    self._final_seq[stream] = max(seq, self._final_seq.get(stream, 0))
+                if not text:
+                    continue
+                self.append_dialogue(speaker, text, stream)
 
                 # 重新加载医生姓名（以防有更新）
                 self.load_doctor_names()
@@ -156,8 +225,43 @@ class ASRPanel(QWidget):
             import traceback
             logger.error(traceback.format_exc())
             logger.warning(f"文本队列读取出错: {e}")
+        finally:
+            self._render_partials()
+
+    def _is_stale(self, stream, seq) -> bool:
+        """partial 所属的句子已经出了 final，或比当前显示的 partial 更早"""
+        if seq is None:
+            return False
+        if seq <= self._final_seq.get(stream, 0):
+            return True
+        current = self._partials.get(stream)
+        return current is not None and current[2] is not None and seq < current[2]
+
+    def _clear_partials(self):
+        """移除对话末尾的 partial 文本"""
+        if self._partial_pos is None:
+            return
+        cursor = self.text_browser.textCursor()
+        cursor.setPosition(min(self._partial_pos, self.text_browser.document().characterCount() - 1))
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self._partial_pos = None
+
+    def _render_partials(self):
+        if not self._partials:
+            return
+        cursor = self.text_browser.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        self._partial_pos = cursor.position()
+        for stream, (speaker, text, _) in self._partials.items():
+            prefix = f"[{stream}] " if stream is not None else ""
+            self.text_browser.append(
+                f'<div style="color:{self.unknown_color}; margin:1px; font-size:13px; line-height:1.1;">'
+                f'<i>{prefix}{speaker}：{text}…</i></div>'
+            )
+        self.text_browser.verticalScrollBar().setValue(self.text_browser.verticalScrollBar().maximum())
 
-    def append_dialogue(self, speaker, text):
+    def append_dialogue(self, speaker, text, stream=None):
         # 确定颜色
         if speaker in self.doctor_names:
             # 已注册的医生使用蓝色
@@ -175,6 +279,8 @@ class ASRPanel(QWidget):
         # 医生说话时显示额外信息
         speaker_prefix = "🏥 " if speaker in self.doctor_names else "💬 "
         display_name = f"{speaker_prefix}{display_name}"
+        if stream is not None:
+            display_name = f"[{stream}] {display_name}"
 
         html = f"""
                 <div style="color:{color}; margin:1px; font-size:13px; line-height:1.1;">
@@ -195,4 +301,6 @@ class ASRPanel(QWidget):
     def clear_dialogues(self):
         """清空对话内容"""
         self.text_browser.clear()
+        self._partials.clear()
+        self._partial_pos = None
         logger.info("ASR对话内容已清空")
\ No newline at end of file
@@ -111,7 +111,7 @@ class SettingsDialog(QDialog):
 
         self.asr_model_combo = QComboBox()
         self.asr_model_combo.addItem("请选择 ASR 模型")
-        self.asr_model_combo.addItems(["vosk", "funasr"])
+        self.asr_model_combo.addItems(["vosk", "funasr", "onnx", "nano"])
 
         default_asr = cfg.get("asr", "model", "funasr")
         idx = self.asr_model_combo.findText(default_asr)
@@ -123,7 +123,16 @@ class SettingsDialog(QDialog):
         self.denoise_checkbox = QCheckBox("启用降噪")
         self.denoise_checkbox.setChecked(cfg.get("asr", "denoise", True))
 
+        self.vad_mode_combo = QComboBox()
+        self.vad_mode_combo.addItems(["webrtc", "energy", "hybrid"])
+        idx = self.vad_mode_combo.findText(cfg.get("asr", "vad_mode", "webrtc"))
+        self.vad_mode_combo.setCurrentIndex(idx if idx != -1 else 0)
+
         asr_layout.addRow("ASR 模型选择:", self.asr_model_combo)
+        asr_layout.addRow("VAD 模式:", self.vad_mode_combo)
+        self.hotwords_edit = QLineEdit("，".join(cfg.get("asr", "hotwords", []) or []))
+        self.hotwords_edit.setPlaceholderText("品种、药名、检查项目，逗号分隔")
+        asr_layout.addRow("热词:", self.hotwords_edit)
         asr_layout.addRow(self.denoise_checkbox)
 
         tabs.addTab(asr_tab, "语音识别")
@@ -311,6 +320,8 @@ class SettingsDialog(QDialog):
         missing_models = []
         models_to_download = []
         # 更新模型类型列表，包含新的声纹识别模型
+        if current_asr == "onnx" and not cfg.get("asr", "streaming", True):
+            current_asr = "onnx_offline"
         for model_type in [current_asr, 'spk', 'voiceprint']:
             if model_type in downloader.MODELS:  # 只下载支持的模型
                 if not downloader.check_model_exists(model_type):
@@ -471,6 +482,9 @@ class SettingsDialog(QDialog):
             cfg.set("asr", "model", asr_model)
         cfg.set("llm", "mcp", self.mcp_checkbox.isChecked())
         cfg.set("asr", "denoise", self.denoise_checkbox.isChecked())
+        cfg.set("asr", "vad_mode", self.vad_mode_combo.currentText())
+        hotwords = self.hotwords_edit.text().replace("，", ",").split(",")
+        cfg.set("asr", "hotwords", [w.strip() for w in hotwords if w.strip()])
 
         cfg.set("process", "audio_queue_size", self.audio_queue_spin.value())
         cfg.set("process", "text_queue_size", self.text_queue_spin.value())
@@ -11,12 +11,13 @@ class WaveformWidget(QWidget):
     def __init__(self, audio_receive, parent=None):
         super().__init__(parent)
         self.audio_receive = audio_receive
-        self.frame_len = 1600  # 100ms @ 48kHz
-        self.latest = np.zeros(1600, dtype=np.int16)
-        self.decay_frame = np.zeros(self.frame_len, dtype=np.float32)
 
         self.num_bars = 40
-        self.last_bar_values = [0.0] * (self.num_bars // 2)
+        half = self.num_bars // 2
+        # 录音进程发来的 RMS 包络（已重采样到每根柱子一个值），None 表示空闲
+        self.latest = None
+        self.decay_bars = np.zeros(half, dtype=np.float32)
+        self.last_bar_values = [0.0] * half
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.update)
@@ -26,19 +27,25 @@ class WaveformWidget(QWidget):
         self.recv_thread.start()
 
     def _recv_run(self):
+        half = self.num_bars // 2
         while True:
             try:
-                if self.audio_receive.poll():
-                    data = self.audio_receive.recv()
-                    if isinstance(data, np.ndarray) and data.dtype == np.int16:
-                        self.latest = data.copy()
-                        # 重置 decay_frame 以匹配新数据的长度
-                        self.decay_frame = np.zeros(len(self.latest), dtype=np.float32)
+                if not self.audio_receive.poll(0.1):
+                    continue
+                data = self.audio_receive.recv()
+                # 包络: float32 (2, N)，第 0 行 RMS，第 1 行峰值；N == 0 表示停止录音
+                if isinstance(data, np.ndarray) and data.ndim == 2:
+                    if data.shape[1] == 0:
+                        self.latest = None
+                        continue
+                    idx = np.linspace(0, data.shape[1] - 1, half).astype(int)
+                    # 最新的帧画在中间
+                    self.latest = data[0, idx][::-1].copy()
             except Exception as e:
                 logger.warning(f"[WaveformWidget] 音频接收线程异常: {e}")
 
     def reset_waveform(self):
-        self.decay_frame = np.zeros_like(self.decay_frame)
+        self.decay_bars = np.zeros_like(self.decay_bars)
         self.update()
 
     def resume_waveform(self):
@@ -56,25 +63,22 @@ class WaveformWidget(QWidget):
         gradient.setColorAt(1.0, QColor(10, 10, 10))
         painter.fillRect(self.rect(), gradient)
 
-        if self.latest is None or len(self.latest) == 0:
+        latest = self.latest
+        if latest is None:
             self._draw_idle_state(painter, w, h)
             return
 
         # 平滑衰减
-        self.decay_frame = 0.85 * self.decay_frame + 0.15 * self.latest
-        data = np.interp(self.decay_frame, [-32768, 32767], [-1.0, 1.0])
+        self.decay_bars = 0.85 * self.decay_bars + 0.15 * latest
 
         num_bars = self.num_bars
-        samples_per_bar = len(data) // num_bars
         bar_width = w / num_bars * 0.6
         gap = w / num_bars * 0.4
         center_x = w / 2
         scale_factor = 8.0
 
         for i in range(num_bars // 2):
-            start_idx = i * samples_per_bar
-            end_idx = start_idx + samples_per_bar
-            bar_value = np.abs(data[start_idx:end_idx]).mean()
+            bar_value = float(self.decay_bars[i])
 
             # ✨ 非线性增强
             bar_value = bar_value ** 1.5
@@ -7,7 +7,7 @@ home_dir = os.path.expanduser("~")
 
 os.makedirs(os.path.join(home_dir, ".vetvoice"), exist_ok=True)
 
-def get_libopus_path(base_dir="libs/webrtc_apm") -> str:
+def get_libopus_path(base_dir="libs/libopus") -> str:
     """
     自动获取适配当前平台和架构的 libopus 库路径。
     :param base_dir: 基础库目录
@@ -38,7 +38,7 @@ def get_libopus_path(base_dir="libs/webrtc_apm") -> str:
         raise RuntimeError(f"不支持的CPU架构: {machine}")
 
     # 拼接路径
-    lib_name = "libwebrtc_apm" + ext if system != "windows" else "opus.dll"
+    lib_name = "libopus" + ext if system != "windows" else "opus.dll"
     full_path = os.path.join(base_dir, os_dir, arch, lib_name)
 
     # if not os.path.exists(full_path):
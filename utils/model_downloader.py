@@ -153,6 +153,29 @@ class ModelDownloader:
             'check_files': ['model.pt', 'config.yaml'],
             'cache_path': '.cache/shuai1618/paraformer-zh-streaming'
         },
+        # onnx 引擎从 paraformer 的 torch 权重导出，下载内容与 funasr 相同
+        'onnx': {
+            'name': 'Paraformer 中文语音识别模型（ONNX）',
+            'modelscope_id': 'shuai1618/paraformer-zh-streaming',
+            'revision': 'master',
+            'check_files': ['model.pt', 'config.yaml'],
+            'cache_path': '.cache/shuai1618/paraformer-zh-streaming'
+        },
+        # onnx 引擎关闭流式识别时使用的离线 paraformer
+        'onnx_offline': {
+            'name': 'Paraformer 中文整句识别模型（ONNX）',
+            'modelscope_id': 'iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-pytorch',
+            'revision': 'master',
+            'check_files': ['model.pt', 'config.yaml'],
+            'cache_path': '.cache/iic/speech_paraformer-large_asr_nat-zh-cn-16k-common-vocab8404-pytorch'
+        },
+        'nano': {
+            'name': 'Fun-ASR-Nano 语音识别大模型',
+            'modelscope_id': 'FunAudioLLM/Fun-ASR-Nano-2512',
+            'revision': 'master',
+            'check_files': ['model.pt', 'config.yaml'],
+            'cache_path': '.cache/FunAudioLLM/Fun-ASR-Nano-2512'
+        },
         'spk': {
             'name': 'Speaker 说话人识别模型',
             'modelscope_id': 'shuai1618/speaker-diarization',
@@ -14,21 +14,83 @@ from settings import cfg
 from utils.resource_path import get_resource_path
 from utils.common import is_meaningful
 import traceback
+import time
 import numpy as np
-import traceback
+import os
+import glob
 import tempfile
-import soundfile
+from dataclasses import dataclass, field
+from voice.asr_batcher import BatchScheduler
+from voice.hotwords import HotwordTable
 MIN_ASR_SECONDS = 1.8
+WARMUP_SECONDS = 2.0
+# 语音段临时文件的专用目录，需要落盘的语音段只能写在这里，启动检查也只扫描这里
+SEGMENT_TMP_DIR = os.path.join(tempfile.gettempdir(), "vetvoice_segments")
+
+
+def _join_words(a: str, b: str) -> str:
+    """vosk 输出以空格分词，拼接多次结果时保留一个空格"""
+    return f"{a} {b}" if a and b else (a or b)
+
+
+def warmup_segment(sample_rate=16000, seconds=WARMUP_SECONDS) -> np.ndarray:
+    """预热用的合成语音段：带谐波的浊音 + 少量噪声，长度覆盖多个流式块"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    f0 = 140 + 20 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    sig = sum(np.sin(k * phase) / k for k in range(1, 6)) * 5000 + rng.normal(0, 300, len(t))
+    return np.clip(sig, -32768, 32767).astype(np.int16)
+
+
+def report_stale_segment_files(tmp_dir=SEGMENT_TMP_DIR):
+    """
+    启动时统计专用临时目录里残留的语音段 WAV，提示用户清理。
+    旧版本写在系统临时目录、文件名没有可识别的前缀，无法与其他程序的文件区分，因此不再扫描系统临时目录
+    """
+    files = glob.glob(os.path.join(tmp_dir, "*.wav"))
+    if files:
+        size = sum(os.path.getsize(f) for f in files if os.path.isfile(f))
+        logger.warning(f"[ASR] 临时目录残留 {len(files)} 个旧版本语音段 WAV，共 {size / 1e6:.1f} MB，可手动删除")
+    return len(files)
+
+
+@dataclass
+class StreamState:
+    """单路音频流（诊室）的识别状态，多路输入时每路一份"""
+    asr_buffer: list = field(default_factory=list)
+    asr_buffer_len: int = 0
+    re_buffer: list = field(default_factory=list)
+    asr_text_buffer: str = ''
+    cache: dict = field(default_factory=dict)
+    last_speaker: str = "用户"
+    partial_sent: bool = False  # 流式模式下本句已发出过 partial
+    seq: int = None             # 工作进程池模式下当前句子的全局序号
+    last_partial_at: float = 0.0  # 上次发出 partial 的时间（限速用）
+    last_partial_text: str = ''
+    hotword_version: int = 0    # vosk: 当前识别器已应用的热词表版本
+    recognizer: object = None  # vosk: 每路一个 KaldiRecognizer
+
+
 class StreamVadAsr:
-    def __init__(self, audio_queue, text_queue, sample_rate=16000):
+    def __init__(self, audio_queue, text_queue, sample_rate=16000, audio_stats=None):
+        t0 = time.perf_counter()
         self.audio_queue = audio_queue
         self.text_queue = text_queue
+        # 与录音进程共享的 audio_queue 统计，取走一段就计数一次
+        self.audio_stats = audio_stats
+        self._high_watermark = False
         self.sample_rate = sample_rate
         self.frame_len = 160  # 10ms 对应的采样点数 (16kHz)
         self.max_segment_len = sample_rate * 15
         # ASR 模型 - 使用动态资源路径
         self.asr_model=cfg.get("asr","model")
-        model_path = str(get_resource_path(cfg.get("asr", f"model_{self.asr_model}_path")))
+        # 流式 paraformer：torch（funasr）和 onnxruntime（onnx）引擎都支持
+        self.streaming = self.asr_model in ("funasr", "onnx") and cfg.get("asr", "streaming", True)
+        # onnx 整句识别需要离线 paraformer 的导出，与流式模型分开存放
+        path_key = "model_onnx_offline_path" if self.asr_model == "onnx" and not self.streaming \
+            else f"model_{self.asr_model}_path"
+        model_path = str(get_resource_path(cfg.get("asr", path_key)))
 
         # 检查模型路径是否存在
         from pathlib import Path
@@ -41,51 +103,101 @@ class StreamVadAsr:
 
         logger.info(f"✅ ASR模型路径存在: {full_model_path}")
 
-        if self.asr_model == "funasr":
+        if self.asr_model in ("funasr", "nano"):
             from funasr import AutoModel
+        elif self.asr_model == "onnx":
+            from voice.onnx_engine import OnnxParaformer
         elif self.asr_model == "vosk":
             import vosk
 
         try:
             if self.asr_model == "funasr":
                 self.asr_recognizer = AutoModel(model=model_path, disable_update=True, device=cfg.get("asr",'device'))
+            elif self.asr_model == "nano":
+                # Fun-ASR-Nano：模型类定义在工程根目录的 model.py
+                self.asr_recognizer = AutoModel(model=model_path, trust_remote_code=True, disable_update=True,
+                                                remote_code=str(Path(__file__).resolve().parent.parent / "model.py"),
+                                                device=cfg.get("asr", 'device'))
+                # 编码器输出缓存：同一段音频换热词/语种重解码或二次识别时跳过编码器
+                self.asr_recognizer.model.enable_encoder_cache(
+                    cfg.get("asr", "nano_encoder_cache_mb", 256),
+                    cfg.get("asr", "nano_encoder_cache_dir", "") or None,
+                )
+            elif self.asr_model == "onnx":
+                # CPU 上的 int8 量化 paraformer，generate 接口与 AutoModel 一致
+                self.asr_recognizer = OnnxParaformer(
+                    model_path, self.streaming,
+                    intra_op_threads=cfg.get("asr", "onnx_threads", 4),
+                    quantize=cfg.get("asr", "onnx_quantize", True),
+                )
             else:
-                self.asr_recognizer = vosk.KaldiRecognizer(vosk.Model(model_path), 16000)
+                # 模型只加载一次，各路音频流各自创建识别器
+                self._vosk_model = vosk.Model(model_path)
+                self.asr_recognizer = vosk.KaldiRecognizer(self._vosk_model, 16000)
         except Exception as e:
             logger.error(f"❌ 模型加载失败: {e}")
             logger.error("请在设置中检查并下载正确的模型文件")
             self.asr_recognizer = None
-        # self.asr_recognizer=AutoModel(model="FunAudioLLM/Fun-ASR-Nano-2512",
-        #                               trust_remote_code=True,
-        #                               disable_update=True,
-        #                               remote_code="./model.py",
-        #                               device="mps")
-        self.asr_buffer = []
-        self.asr_text_buffer=''
-        self.asr_text=''
-        self.asr_buffer_len = 0
+        report_stale_segment_files()
+        # 各路音频流的缓冲和 cache，键为录音端的 stream_id（单路时为 None）
+        self._streams = {}
         self.min_asr_smaples = int(MIN_ASR_SECONDS * self.sample_rate)
         self.min_embed_smaples = int(MIN_ASR_SECONDS * self.sample_rate)
-        self.chunk_size = [0, 64, 32]
+        # 流式 paraformer：chunk_size[1] * 60ms = 600ms 一块，cache 在整句内保留
+        self.chunk_size = [0, 10, 5]
+        self.chunk_stride = self.chunk_size[1] * 960
         self.encoder_chunk_look_back = 4
         self.decoder_chunk_look_back = 1
-        self.cache = {}
-        
+        # 诊所热词：按引擎编译一次并缓存，热词表变化时才重建
+        self.hotwords = HotwordTable()
+        # vosk grammar 会把识别限制在热词 + [unk] 范围内，只适合指令类场景，默认关闭
+        self.vosk_grammar = cfg.get("asr", "vosk_grammar", False)
+        # vosk 增量解码的 partial 限速，0 表示不发 partial
+        partial_rate = cfg.get("asr", "partial_rate_hz", 5)
+        self.partial_interval = 1 / partial_rate if partial_rate else None
+        # Fun-ASR-Nano 整句识别时边生成边发 partial，关闭后走整句合批
+        self.nano_stream = self.asr_model == "nano" and cfg.get("asr", "nano_stream_tokens", True)
+        # 整句识别时把时间窗内就绪的多个 final 段合批；流式模式带 cache 逐块解码，不合批
+        max_batch = cfg.get("asr", "batch_size", 8)
+        self._batcher = None
+        if (self.asr_recognizer is not None and not self.streaming and not self.nano_stream
+                and max_batch > 1):
+            if self._supports_batch(model_path):
+                self._batcher = BatchScheduler(
+                    self._funasr_batch, max_batch,
+                    cfg.get("asr", "batch_wait_ms", 50), self.sample_rate,
+                    fallback_fn=lambda segment: self._funasr(segment, True, {}),
+                )
+            else:
+                logger.warning(f"[ASR] 模型 {model_path} 不支持批量识别，忽略 asr.batch_size={max_batch}")
+
 
         # 说话人识别模块
         self.voiceprint_manager = VoiceprintManager()
-        self.re_buffer=[]
-        self.last_speaker = "用户"  # 添加 last_speaker 记录
         logger.info("[Voiceprint] 声纹识别模块已初始化")
         logger.info(f"[Voiceprint] 已录入医生数量: {self.voiceprint_manager.has_doctors()}")
         if self.voiceprint_manager.has_doctors():
             doctors = self.voiceprint_manager.get_doctor_names()
             logger.info(f"[Voiceprint] 已录入医生: {', '.join(doctors)}")
+        self.load_ms = (time.perf_counter() - t0) * 1000
         
 
 
 
-    def _funasr(self,segment, is_final: bool=False):
+    def _state(self, stream_id) -> StreamState:
+        state = self._streams.get(stream_id)
+        if state is None:
+            state = StreamState()
+            if self.asr_model == 'vosk':
+                import vosk
+                state.recognizer = (self.asr_recognizer if not self._streams
+                                    else vosk.KaldiRecognizer(self._vosk_model, 16000))
+                self._apply_vosk_grammar(state)
+            self._streams[stream_id] = state
+            logger.info(f"[ASR] 新音频流: {stream_id}")
+        return state
+
+    def _funasr(self,segment, is_final: bool=False, cache: dict=None, streaming: bool=False):
         if self.asr_recognizer is None:
             logger.error("[ASR] 语音识别模型未加载，跳过识别")
             return None
@@ -93,45 +205,88 @@ class StreamVadAsr:
         try:
             if segment.dtype != np.float32:
                 segment = segment.astype(np.float32) / 32768.0
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                # 写入音频数据，假设采样率为16000Hz，可调整
-                soundfile.write(tmp.name, segment, 16000, format='WAV', subtype='PCM_16')
-                res = self.asr_recognizer.generate(
-                        input=[tmp.name],
-                        cache=self.cache,
-                        is_final=is_final,
-                        batch_size=1
-                    )
-                # .generate(input=[wav_path], cache={}, batch_size=1)
+            chunk_kwargs = dict(
+                chunk_size=self.chunk_size,
+                encoder_chunk_look_back=self.encoder_chunk_look_back,
+                decoder_chunk_look_back=self.decoder_chunk_look_back,
+            ) if streaming else {}
+            # 直接送入内存中的 float32 数组，不再经过临时 WAV 文件编解码
+            res = self.asr_recognizer.generate(
+                    input=segment,
+                    fs=self.sample_rate,
+                    cache=cache if cache is not None else {},
+                    is_final=is_final,
+                    batch_size=1,
+                    **chunk_kwargs,
+                    **self._hotword_kwargs()
+                )
             if not res:
                 return None
             else:
                 if isinstance(res, list) and 'text' in res[0]:
-                    print(self.cache,res[0]['text'])
                     return res[0]['text'].strip()
                 elif isinstance(res, dict) and 'text' in res:
-                    print(self.cache,res['text'])
                     return res['text'].strip()
             return None
         except:
              logger.error(f"[ASR] 识别失败: {str(traceback.format_exc())}")
              return None
-    def _vosk(self,segment):
-        byte_data = np.array(segment, dtype=np.int16).tobytes()
-        if self.asr_recognizer.AcceptWaveform(byte_data):
-                result = json.loads(self.asr_recognizer.Result())
-                text = result.get("text", "").strip()
-                if text:
-                    logger.info(f"VOSK识别结果: {text}")
-                    return text
-        else:
-                partial = json.loads(self.asr_recognizer.PartialResult())
+    def _supports_batch(self, model_path) -> bool:
+        """
+        只有离线 paraformer（config.yaml 中 model 不是 *Streaming）和 Fun-ASR-Nano 支持多段合批；
+        流式 paraformer 按 batch_size=1 使用，onnx 引擎内部逐段识别，合批没有收益
+        """
+        if self.asr_model == "nano":
+            return True
+        if self.asr_model != "funasr":
+            return False
+        import re
+        try:
+            with open(os.path.join(model_path, "config.yaml"), encoding="utf-8") as f:
+                m = re.search(r"^model:\s*(\S+)", f.read(), re.M)
+        except OSError:
+            return False
+        return m is not None and "streaming" not in m.group(1).lower()
 
-                logger.debug(f"实时识别: {partial.get('partial', '')}")
+    def _funasr_batch(self, segments) -> list:
+        """一次 generate 识别多段整句，返回与输入顺序一致的文本"""
+        batch = [s if s.dtype == np.float32 else s.astype(np.float32) / 32768.0 for s in segments]
+        res = self.asr_recognizer.generate(
+            input=batch,
+            fs=self.sample_rate,
+            cache={},
+            is_final=True,
+            batch_size=len(batch),
+            **self._hotword_kwargs()
+        )
+        return [r.get('text', '').strip() for r in res]
+
+    def _hotword_kwargs(self) -> dict:
+        """
+        热词参数（已缓存的编译结果）：
+        funasr 传 hotword 文件，供 SeACo/Contextual paraformer 使用，其他模型忽略；nano 传 hotword_prompt
+        """
+        if self.asr_model == "nano":
+            prompt = self.hotwords.compiled("nano")
+            return {} if prompt is None else {"hotword_prompt": prompt}
+        if self.asr_model != "funasr":
+            return {}
+        hotword = self.hotwords.compiled("paraformer")
+        if hotword is None:
+            return {}
+        return {"hotword": hotword}
+
+    def _apply_vosk_grammar(self, state: StreamState):
+        """热词表变化后在句间更新 vosk 识别器的 grammar（asr.vosk_grammar 开启时）"""
+        if not self.vosk_grammar:
+            return
+        grammar = self.hotwords.compiled("vosk")
+        if state.hotword_version == self.hotwords.version:
+            return
+        state.hotword_version = self.hotwords.version
+        if grammar is not None:
+            state.recognizer.SetGrammar(grammar)
 
-            
-        
-        return None
     def asr(self):
         logger.info("ASR识别线程启动...")
 
@@ -144,10 +299,26 @@ class StreamVadAsr:
         while True:
             try:
                 # 接收三元组：audio_data, is_final, speaker
-                item = self.audio_queue.get(timeout=1)
+                wait = self._batcher.timeout() if self._batcher is not None else None
+                item = self.audio_queue.get(timeout=1 if wait is None else max(wait, 0.001))
+                if self.audio_stats is not None:
+                    self.audio_stats.incr("consumed")
+                    high = bool(self.audio_stats.get("high_watermark"))
+                    if high != self._high_watermark:
+                        self._high_watermark = high
+                        logger.warning(f"[ASR] audio_queue 高水位: {high}, 统计: {self.audio_stats.snapshot()}")
 
-                # 兼容处理：可能是旧格式的二元组或新格式的三元组
-                if len(item) == 3:
+                # 兼容处理：五元组带句子序号（ASR 工作进程池），四元组带 stream_id（多诊室），
+                # 三元组带说话人，二元组为旧格式
+                stream_id = None
+                seq = None
+                if len(item) == 5:
+                    frame, is_final, speaker_tag, stream_id, seq = item
+                    logger.debug(f"[ASR] 获取音频段 #{seq}，长度: {len(frame)} samples, 说话人: {speaker_tag}, 音频流: {stream_id}")
+                elif len(item) == 4:
+                    frame, is_final, speaker_tag, stream_id = item
+                    logger.debug(f"[ASR] 获取音频段，长度: {len(frame)} samples, 说话人: {speaker_tag}, 音频流: {stream_id}")
+                elif len(item) == 3:
                     frame, is_final, speaker_tag = item
                     logger.debug(f"[ASR] 获取音频段，长度: {len(frame)} samples, 说话人: {speaker_tag}")
                 else:
@@ -160,83 +331,310 @@ class StreamVadAsr:
                     continue
 
             except queue.Empty:
+                if self._batcher is not None:
+                    self._emit_batch(self._batcher.flush())
                 continue
             except Exception as e:
                 logger.error(f"{str(traceback.format_exc())}")
                 continue
-            
+
+            state = self._state(stream_id)
+            state.seq = seq
             # ===== 累积 =====
             if  frame is not None and len(frame)>0:
-                self.asr_buffer.append(frame)
-                self.re_buffer.append(frame)
-                self.asr_buffer_len += len(frame)
+                state.asr_buffer.append(frame)
+                state.re_buffer.append(frame)
+                state.asr_buffer_len += len(frame)
+            if self.streaming:
+                self._stream_decode(state, is_final, speaker_tag, stream_id)
+                continue
+            if self.asr_model == 'vosk':
+                self._vosk_decode(state, is_final, speaker_tag, stream_id)
+                continue
+            if self.nano_stream:
+                self._nano_decode(state, is_final, speaker_tag, stream_id)
+                continue
+            if self._batcher is not None:
+                if is_final:
+                    self._submit_final(state, speaker_tag, stream_id)
+                if self._batcher.due():
+                    self._emit_batch(self._batcher.flush())
+                continue
             # ===== 是否asr=====
-            if is_final:
-                if self.asr_buffer_len>=int(0.1 * self.sample_rate):
+            if not is_final:
+                continue
+            asr_text = ''
+            if state.asr_buffer_len>=int(0.1 * self.sample_rate):
                 # ===== 拼接整句 =====
-                    segment = np.concatenate(self.asr_buffer)
-                    self.asr_buffer.clear()
-                    self.asr_buffer_len = 0
-                    text=self._funasr(segment,True) if self.asr_model=='funasr' else self._vosk(segment )
-                    self.asr_text_buffer += text if  is_meaningful(text) else ''
-                    self.cache.clear()
-                    self.asr_text=self.asr_text_buffer
-                    self.asr_text_buffer=''
-            # elif self.asr_buffer_len >= self.min_asr_smaples:
-            #     segment = np.concatenate(self.asr_buffer)
-            #     self.asr_buffer.clear()
-            #     self.asr_buffer_len = 0
-            #     text=self._funasr(segment,False) if self.asr_model=='funasr' else self._vosk(segment )
-            #     self.text_queue.put_nowait(json.dumps({"speaker": '.', "text": text}))
-            #     self.asr_text_buffer += text if  is_meaningful(text) else ''
-            #     continue
-            else:
-                continue    
-            
-            # ========== Speaker ReID（只在 final 做） ==========
-            # 使用从录音器传递过来的说话人信息
-            # 如果录音器提供了speaker_tag，则直接使用；否则进行声纹识别
-            if speaker_tag != "用户":
-                # 录音器已经识别为医生，直接使用
-                logger.debug(f"[ASR] 使用录音器识别的说话人: {speaker_tag}")
-            else:
-                # 录音器标记为用户，但仍需再次检查是否为医生（双重确认）
-                try:
-                    if len(self.re_buffer) > 0:
-                        segment = np.concatenate(self.re_buffer)
-                        self.re_buffer.clear()
-
-                        if len(segment) < self.min_asr_smaples:
-                            # 段落过短，复用前一个speaker
-                            speaker_tag = self.last_speaker
-                            logger.debug(f"[Voiceprint] 段落过短({len(segment)} samples)，复用前一个 speaker: {speaker_tag}")
+                segment = np.concatenate(state.asr_buffer)
+                state.asr_buffer.clear()
+                state.asr_buffer_len = 0
+                text=self._funasr(segment,True,state.cache)
+                state.asr_text_buffer += text if  is_meaningful(text) else ''
+                state.cache.clear()
+                asr_text=state.asr_text_buffer
+                state.asr_text_buffer=''
+
+            speaker_tag = self._identify_final_speaker(state, speaker_tag)
+            logger.info(f"[ASR] speaker: {speaker_tag} text: {asr_text}")
+            # 池模式下每句都要发 final（可能为空），分发进程按序号重排
+            if asr_text!='' or seq is not None:
+                self._put_text(speaker_tag, asr_text, stream_id, seq=seq)
+            state.cache.clear()
+
+    def _submit_final(self, state: StreamState, speaker_tag, stream_id):
+        """整句就绪：按本句音频先做声纹确认，整句交给批调度器"""
+        segment = None
+        if state.asr_buffer_len >= int(0.1 * self.sample_rate):
+            segment = np.concatenate(state.asr_buffer)
+            state.asr_buffer.clear()
+            state.asr_buffer_len = 0
+        # 声纹确认要在下一句音频进入 re_buffer 之前完成
+        speaker_tag = self._identify_final_speaker(state, speaker_tag)
+        if segment is not None:
+            self._emit_batch(self._batcher.add(segment, (stream_id, speaker_tag, state.seq)))
+        elif state.seq is not None:
+            self._put_text(speaker_tag, '', stream_id, seq=state.seq)
+
+    def _emit_batch(self, results):
+        """按提交顺序发出批识别结果"""
+        for (stream_id, speaker_tag, seq), text in results:
+            asr_text = text if is_meaningful(text) else ''
+            logger.info(f"[ASR] speaker: {speaker_tag} text: {asr_text}")
+            if asr_text != '' or seq is not None:
+                self._put_text(speaker_tag, asr_text, stream_id, seq=seq)
+
+    def _stream_decode(self, state: StreamState, is_final, speaker_tag, stream_id):
+        """
+        流式解码：缓冲凑满 600ms 就带着持久 cache 解一块，发出 partial（UI 原地替换）；
+        is_final 时把剩余音频作为最后一块解码，发出整句结果并清空 cache
+        """
+        stride = self.chunk_stride
+        if state.asr_buffer_len < stride and not is_final:
+            return
+        audio = np.concatenate(state.asr_buffer) if state.asr_buffer else np.zeros(0, dtype=np.int16)
+        n = len(audio) if is_final else len(audio) // stride * stride
+        if is_final and n == 0:
+            # 没有剩余音频时用一帧静音冲出解码器尾部
+            audio = np.zeros(self.frame_len, dtype=np.int16)
+            n = len(audio)
+        new_text = ''
+        for i in range(0, n, stride):
+            last = is_final and i + stride >= n
+            new_text += self._funasr(audio[i:i + stride], last, state.cache, streaming=True) or ''
+        rest = audio[n:]
+        state.asr_buffer = [rest] if len(rest) else []
+        state.asr_buffer_len = len(rest)
+        state.asr_text_buffer += new_text
+
+        if not is_final:
+            if new_text:
+                self._put_text(state.last_speaker, state.asr_text_buffer, stream_id, partial=True)
+                state.partial_sent = True
+            return
+
+        asr_text = state.asr_text_buffer if is_meaningful(state.asr_text_buffer) else ''
+        state.asr_text_buffer = ''
+        state.cache.clear()
+        speaker_tag = self._identify_final_speaker(state, speaker_tag)
+        logger.info(f"[ASR] speaker: {speaker_tag} text: {asr_text}")
+        # 发过 partial 的句子即使最终为空也要发 final，让 UI 撤掉 partial
+        if asr_text or state.partial_sent or state.seq is not None:
+            self._put_text(speaker_tag, asr_text, stream_id, seq=state.seq)
+        state.partial_sent = False
+
+    def _vosk_decode(self, state: StreamState, is_final, speaker_tag, stream_id):
+        """
+        Vosk 增量解码：语音段一到就送入识别器，按 partial_rate_hz 限速发出 partial，
+        显示延迟取决于 vosk 解码而不是 VAD 断句；final 时取 FinalResult 作为整句
+        """
+        recognizer = state.recognizer
+        for frame in state.asr_buffer:
+            if recognizer.AcceptWaveform(np.asarray(frame, dtype=np.int16).tobytes()):
+                # vosk 自身判定的分句，并入本句文本
+                state.asr_text_buffer = _join_words(state.asr_text_buffer, json.loads(recognizer.Result()).get("text", ""))
+        state.asr_buffer.clear()
+        state.asr_buffer_len = 0
+
+        if not is_final:
+            now = time.monotonic()
+            if self.partial_interval is not None and now - state.last_partial_at >= self.partial_interval:
+                state.last_partial_at = now
+                partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                text = _join_words(state.asr_text_buffer, partial)
+                if text and text != state.last_partial_text:
+                    self._put_text(state.last_speaker, text, stream_id, partial=True)
+                    state.partial_sent = True
+                    state.last_partial_text = text
+            return
+
+        text = _join_words(state.asr_text_buffer, json.loads(recognizer.FinalResult()).get("text", ""))
+        asr_text = text if is_meaningful(text) else ''
+        state.asr_text_buffer = ''
+        state.last_partial_text = ''
+        self._apply_vosk_grammar(state)
+        speaker_tag = self._identify_final_speaker(state, speaker_tag)
+        logger.info(f"[ASR] speaker: {speaker_tag} text: {asr_text}")
+        if asr_text or state.partial_sent or state.seq is not None:
+            self._put_text(speaker_tag, asr_text, stream_id, seq=state.seq)
+        state.partial_sent = False
+
+    def _nano_stream(self, segment):
+        """Fun-ASR-Nano 逐 token 解码一整句，依次产出当前累计的文本"""
+        if segment.dtype != np.float32:
+            segment = segment.astype(np.float32) / 32768.0
+        kwargs = dict(self.asr_recognizer.kwargs, **self._hotword_kwargs())
+        yield from self.asr_recognizer.model.inference_stream([segment], **kwargs)
+
+    def _nano_decode(self, state: StreamState, is_final, speaker_tag, stream_id):
+        """
+        Fun-ASR-Nano 整句识别：VAD 给出 final 后开始生成，LLM 每解出一段文本就按 partial_rate_hz
+        限速发出 partial，长句不必等全部 token 生成完才上屏；生成结束发出整句
+        """
+        if not is_final:
+            return
+        text = ''
+        if state.asr_buffer_len >= int(0.1 * self.sample_rate):
+            segment = np.concatenate(state.asr_buffer)
+            try:
+                for text in self._nano_stream(segment):
+                    now = time.monotonic()
+                    if self.partial_interval is not None and now - state.last_partial_at >= self.partial_interval:
+                        state.last_partial_at = now
+                        self._put_text(state.last_speaker, text, stream_id, partial=True)
+                        state.partial_sent = True
+            except Exception:
+                logger.error(f"[ASR] 识别失败: {str(traceback.format_exc())}")
+        state.asr_buffer.clear()
+        state.asr_buffer_len = 0
+
+        asr_text = text.strip() if is_meaningful(text) else ''
+        encoder_cache = self.asr_recognizer.model.encoder_cache
+        if encoder_cache is not None:
+            logger.debug(f"[ASR] 编码器缓存: {encoder_cache.stats()}")
+        speaker_tag = self._identify_final_speaker(state, speaker_tag)
+        logger.info(f"[ASR] speaker: {speaker_tag} text: {asr_text}")
+        if asr_text or state.partial_sent or state.seq is not None:
+            self._put_text(speaker_tag, asr_text, stream_id, seq=state.seq)
+        state.partial_sent = False
+
+    def _put_text(self, speaker, text, stream_id=None, partial=False, seq=None):
+        msg = {"speaker": speaker, "text": text}
+        if stream_id is not None:
+            msg["stream"] = stream_id
+        if partial:
+            msg["partial"] = True
+        if seq is not None:
+            msg["seq"] = seq
+        self.text_queue.put_nowait(json.dumps(msg))
+
+    def _identify_final_speaker(self, state: StreamState, speaker_tag):
+        """
+        ========== Speaker ReID（只在 final 做） ==========
+        使用从录音器传递过来的说话人信息
+        如果录音器提供了speaker_tag，则直接使用；否则进行声纹识别
+        """
+        if speaker_tag != "用户":
+            # 录音器已经识别为医生，直接使用
+            logger.debug(f"[ASR] 使用录音器识别的说话人: {speaker_tag}")
+            state.re_buffer.clear()
+            return speaker_tag
+        # 录音器标记为用户，但仍需再次检查是否为医生（双重确认）
+        try:
+            if len(state.re_buffer) > 0:
+                segment = np.concatenate(state.re_buffer)
+                state.re_buffer.clear()
+
+                if len(segment) < self.min_asr_smaples:
+                    # 段落过短，复用前一个speaker
+                    speaker_tag = state.last_speaker
+                    logger.debug(f"[Voiceprint] 段落过短({len(segment)} samples)，复用前一个 speaker: {speaker_tag}")
+                else:
+                    # 使用声纹识别
+                    if self.voiceprint_manager.has_doctors():
+                        identified_speaker, confidence = self.voiceprint_manager.identify_speaker(segment, self.sample_rate)
+                        if confidence is not None:
+                            logger.info(f"[Voiceprint] 识别到: {identified_speaker} (置信度: {confidence:.3f})")
+                            speaker_tag = identified_speaker
                         else:
-                            # 使用声纹识别
-                            if self.voiceprint_manager.has_doctors():
-                                identified_speaker, confidence = self.voiceprint_manager.identify_speaker(segment, self.sample_rate)
-                                if confidence is not None:
-                                    logger.info(f"[Voiceprint] 识别到: {identified_speaker} (置信度: {confidence:.3f})")
-                                    speaker_tag = identified_speaker
-                                else:
-                                    speaker_tag = "用户"
-                            else:
-                                # 没有录入医生声纹，所有说话人都标记为用户
-                                logger.debug(f"[Voiceprint] 没有医生声纹，标记为用户")
-                                speaker_tag = "用户"
-
-                            self.last_speaker = speaker_tag
-                except Exception as e:
-                    logger.error(f"[Voiceprint] 说话人识别失败: {str(traceback.format_exc())}")
-                    speaker_tag = "用户"
-
-            logger.info(f"[ASR] speaker: {speaker_tag} text: {self.asr_text}")
-            if self.asr_text!='':
-                self.text_queue.put_nowait(json.dumps({"speaker": speaker_tag, "text": self.asr_text}))
-            self.asr_text=''
-            self.cache.clear()
+                            speaker_tag = "用户"
+                    else:
+                        # 没有录入医生声纹，所有说话人都标记为用户
+                        logger.debug(f"[Voiceprint] 没有医生声纹，标记为用户")
+                        speaker_tag = "用户"
+
+                    state.last_speaker = speaker_tag
+        except Exception as e:
+            logger.error(f"[Voiceprint] 说话人识别失败: {str(traceback.format_exc())}")
+            speaker_tag = "用户"
+        return speaker_tag
     # ================= Utils =================
 
+    def _decode_once(self, segment) -> str:
+        """按运行时的解码路径识别一整句（预热用），不改动各路音频流的状态"""
+        if self.asr_model == 'vosk':
+            import vosk
+            recognizer = vosk.KaldiRecognizer(self._vosk_model, 16000)
+            recognizer.AcceptWaveform(segment.tobytes())
+            return json.loads(recognizer.FinalResult()).get("text", "")
+        if self.nano_stream:
+            text = ''
+            for text in self._nano_stream(segment):
+                pass
+            return text
+        if self.streaming:
+            cache = {}
+            text = ''
+            for i in range(0, len(segment), self.chunk_stride):
+                last = i + self.chunk_stride >= len(segment)
+                text += self._funasr(segment[i:i + self.chunk_stride], last, cache, streaming=True) or ''
+            return text
+        if self._batcher is not None:
+            return self._funasr_batch([segment])[0]
+        return self._funasr(segment, True, {}) or ''
+
+    def warmup(self) -> dict:
+        """
+        用合成语音段识别两遍：第一遍承担懒加载的内核/计算图初始化（冷启动），
+        第二遍即热态下首句的延迟；声纹模型同样预热一次
+        """
+        segment = warmup_segment(self.sample_rate)
+        latencies = []
+        for _ in range(2):
+            t0 = time.perf_counter()
+            self._decode_once(segment)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        if self.voiceprint_manager.has_doctors():
+            self.voiceprint_manager.identify_speaker(segment, self.sample_rate)
+        info = {
+            "model": self.asr_model,
+            "load_ms": round(self.load_ms),
+            "cold_ms": round(latencies[0]),
+            "warm_ms": round(latencies[1]),
+        }
+        logger.info(f"[ASR] 预热完成 {self.asr_model}: 加载 {info['load_ms']} ms，"
+                    f"首句冷启动 {info['cold_ms']} ms，热态 {info['warm_ms']} ms "
+                    f"({WARMUP_SECONDS:.0f}s 合成语音)")
+        return info
+
+    def _put_status(self, status, **info):
+        """向主进程报告 ASR 状态：loading / ready / error"""
+        try:
+            self.text_queue.put_nowait(json.dumps({"status": status, **info}))
+        except queue.Full:
+            logger.warning(f"[ASR] text_queue 已满，状态消息未送达: {status}")
+
     def start(self):
+        if getattr(self, 'asr_recognizer', None) is None:
+            self._put_status("error", model=self.asr_model)
+        else:
+            info = {"model": self.asr_model, "load_ms": round(self.load_ms)}
+            if cfg.get("asr", "warmup", True):
+                try:
+                    info = self.warmup()
+                except Exception:
+                    logger.error(f"[ASR] 预热失败: {traceback.format_exc()}")
+            self._put_status("ready", **info)
         self.asr()
         logger.info("StreamVadAsr 所有线程已启动")
 
@@ -247,14 +645,28 @@ def run(kwargs):
     control_queue = kwargs.get('control_queue')
     audio_queue: Queue = kwargs['audio_queue']
     text_queue: Queue = kwargs['text_queue']
-    
-    asr_processor = StreamVadAsr(audio_queue, text_queue)
+    audio_stats = kwargs.get('audio_stats', None)
+    # 工作进程池中每个进程限制 torch 线程数，避免 K 个进程互相抢核
+    torch_threads = kwargs.get('torch_threads') or cfg.get("asr", "torch_threads", 0)
+    if torch_threads:
+        torch.set_num_threads(int(torch_threads))
+        logger.info(f"torch 线程数: {torch_threads}")
+
+    try:
+        text_queue.put_nowait(json.dumps({"status": "loading"}))
+    except queue.Full:
+        pass
+    asr_processor = StreamVadAsr(audio_queue, text_queue, audio_stats=audio_stats)
     
     logger.info("🎯 ASR 进程初始化完成，自动启动...")
     asr_processor.start()
     logger.info("✅ ASR 已自动启动，持续监听音频队列...")
     
     while True:
+        if control_queue is None:
+            # 工作进程池中的进程不读控制队列，随主进程退出
+            time.sleep(1)
+            continue
         try:
             if control_queue is not None:
                 try:
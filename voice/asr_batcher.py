@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+ASR 微批调度
+整句识别（非流式）时，把短时间窗口内就绪的多个 final 语音段合成一次 generate 调用，
+结果按提交顺序返回。队列积压（多诊室、长段被切分）时提高模型利用率，空闲时最多多等 max_wait_ms。
+"""
+import time
+
+from loguru import logger
+
+
+class BatchScheduler:
+    def __init__(self, decode_fn, max_batch: int = 8, max_wait_ms: float = 50, sample_rate: int = 16000,
+                 fallback_fn=None):
+        """
+        Args:
+            decode_fn: list[np.ndarray] -> list[str]，一次批量识别，结果与输入一一对应
+            max_batch: 单批最大段数，1 表示不做批处理
+            max_wait_ms: 第一段就绪后最多等待的时间
+            fallback_fn: np.ndarray -> str，批量识别失败时逐段重试，避免整批结果丢失
+        """
+        self.decode_fn = decode_fn
+        self.fallback_fn = fallback_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max_wait_ms / 1000
+        self.sample_rate = sample_rate
+        self._pending = []  # [(audio, ctx)]
+        self._first_at = None
+        # 吞吐统计
+        self.segments = 0
+        self.batches = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, audio, ctx) -> list:
+        """加入一段，凑满一批时立即识别，返回 [(ctx, text)]，否则返回空列表"""
+        if not self._pending:
+            self._first_at = time.monotonic()
+        self._pending.append((audio, ctx))
+        if len(self._pending) >= self.max_batch:
+            return self.flush()
+        return []
+
+    def timeout(self):
+        """距离本批到期的秒数，没有待识别的段时返回 None"""
+        if not self._pending:
+            return None
+        return max(0.0, self._first_at + self.max_wait - time.monotonic())
+
+    def due(self) -> bool:
+        return bool(self._pending) and self.timeout() == 0
+
+    def flush(self) -> list:
+        if not self._pending:
+            return []
+        batch, self._pending = self._pending, []
+        audios = [a for a, _ in batch]
+        t0 = time.perf_counter()
+        try:
+            texts = self.decode_fn(audios)
+        except Exception as e:
+            logger.error(f"[ASR] 批量识别失败（{len(batch)} 段），逐段重试: {e}")
+            texts = [self._decode_one(a) for a in audios]
+        self.busy_seconds += time.perf_counter() - t0
+        self.batches += 1
+        self.segments += len(batch)
+        self.audio_seconds += sum(len(a) for a in audios) / self.sample_rate
+        if self.batches % 100 == 0:
+            logger.info(f"[ASR] 批处理统计: {self.stats()}")
+        return [(ctx, text) for (_, ctx), text in zip(batch, texts)]
+
+    def _decode_one(self, audio):
+        if self.fallback_fn is None:
+            return None
+        try:
+            return self.fallback_fn(audio)
+        except Exception as e:
+            logger.error(f"[ASR] 单段重试识别失败: {e}")
+            return None
+
+    def stats(self) -> dict:
+        busy = self.busy_seconds or 1e-9
+        return {
+            "segments": self.segments,
+            "batches": self.batches,
+            "avg_batch": self.segments / max(1, self.batches),
+            "segments_per_sec": self.segments / busy,
+            "rtf": self.busy_seconds / max(self.audio_seconds, 1e-9),
+        }
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+ASR 工作进程池
+无 GPU 的多核服务器上单个 paraformer 跟不上多路音频时，main.py 启动 K 个 ASR 工作进程（各自加载模型），
+再由一个分发进程：
+  1. 从 audio_queue 取语音段，按音频流（stream）或逐句轮询（round_robin）分给工作进程，
+     每句话分配一个音频流内递增的序号，同一句的所有段都送往同一个工作进程；
+  2. 收集工作进程的结果，final 结果按音频流分别按序号重排后写入 text_queue，
+     partial 带序号直接转发（UI 按序号原地替换，迟到的 final 不会覆盖后一句的 partial）。
+各诊室互不阻塞；某个序号长时间没有结果（工作进程崩溃重启）时先放行后面的句子，迟到的结果仍会发出。
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+
+from loguru import logger
+
+from settings import cfg
+
+DISPATCH_MODES = ("stream", "round_robin")
+
+
+class ReorderBuffer:
+    def __init__(self, skip_after: float = 10.0):
+        """
+        Args:
+            skip_after: 队首序号缺失超过该秒数且后面已有结果时跳过
+        """
+        self.skip_after = skip_after
+        self._next = 1
+        self._ready = {}
+        self._blocked_since = None
+
+    def push(self, seq: int, msg) -> list:
+        """放入一个 final 结果，返回按序可以发出的结果列表"""
+        if seq < self._next:
+            logger.warning(f"[ASRPool] 序号 {seq} 等待超时后才到达，乱序发出")
+            return [msg]
+        self._ready[seq] = msg
+        return self.pop_ready()
+
+    def pop_ready(self) -> list:
+        out = []
+        while self._next in self._ready:
+            out.append(self._ready.pop(self._next))
+            self._next += 1
+        if not self._ready:
+            self._blocked_since = None
+        elif self._blocked_since is None:
+            self._blocked_since = time.monotonic()
+        elif time.monotonic() - self._blocked_since > self.skip_after:
+            skipped = min(self._ready) - self._next
+            logger.warning(f"[ASRPool] 序号 {self._next} 起 {skipped} 句等待超时，跳过")
+            self._next = min(self._ready)
+            self._blocked_since = None
+            out += self.pop_ready()
+        return out
+
+
+class AsrDispatcher:
+    def __init__(self, audio_queue, worker_queues, result_queue, text_queue,
+                 audio_stats=None, mode: str = "stream"):
+        if mode not in DISPATCH_MODES:
+            logger.warning(f"未知分发方式: {mode}，使用 stream")
+            mode = "stream"
+        self.audio_queue = audio_queue
+        self.worker_queues = worker_queues
+        self.result_queue = result_queue
+        self.text_queue = text_queue
+        self.audio_stats = audio_stats
+        self.mode = mode
+        # stream -> 序号计数器 / 重排缓冲，各音频流独立排序，互不阻塞
+        self._seq = {}
+        self._rr = itertools.cycle(range(len(worker_queues)))
+        # stream -> 工作进程（stream 模式固定分配）
+        self._stream_worker = {}
+        # stream -> (seq, worker)，当前未结束的句子
+        self._open = {}
+        self._reorder = {}
+        self._stop_event = threading.Event()
+
+    def _route(self, stream_id):
+        current = self._open.get(stream_id)
+        if current is not None:
+            return current
+        # 单路麦克风（stream_id 为 None）按 stream 分配会让所有句子落到同一个工作进程，始终逐句轮询
+        if self.mode == "stream" and stream_id is not None:
+            worker = self._stream_worker.get(stream_id)
+            if worker is None:
+                worker = self._stream_worker[stream_id] = next(self._rr)
+        else:
+            worker = next(self._rr)
+        if stream_id not in self._seq:
+            self._seq[stream_id] = itertools.count(1)
+            self._reorder[stream_id] = ReorderBuffer()
+        current = self._open[stream_id] = (next(self._seq[stream_id]), worker)
+        return current
+
+    def dispatch(self):
+        """audio_queue -> 工作进程，工作队列满时阻塞，把背压传回录音侧"""
+        while not self._stop_event.is_set():
+            try:
+                item = self.audio_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if self.audio_stats is not None:
+                self.audio_stats.incr("consumed")
+            frame, is_final, speaker, *rest = item
+            stream_id = rest[0] if rest else None
+            seq, worker = self._route(stream_id)
+            if is_final:
+                del self._open[stream_id]
+            while not self._stop_event.is_set():
+                try:
+                    self.worker_queues[worker].put((frame, is_final, speaker, stream_id, seq), timeout=1)
+                    break
+                except queue.Full:
+                    logger.warning(f"[ASRPool] 工作进程 {worker} 积压")
+
+    def collect(self):
+        """工作进程结果 -> 重排 -> text_queue"""
+        while not self._stop_event.is_set():
+            try:
+                item = self.result_queue.get(timeout=1)
+                msg = json.loads(item)
+            except queue.Empty:
+                for reorder in list(self._reorder.values()):
+                    self._emit(reorder.pop_ready())
+                continue
+            if msg.get("partial"):
+                self._emit([msg])
+                continue
+            # 序号保留在消息里，UI 用它判断 final 是否对应当前显示的 partial
+            seq = msg.get("seq")
+            reorder = self._reorder.get(msg.get("stream"))
+            if seq is None or reorder is None:
+                self._emit([msg])
+            else:
+                self._emit(reorder.push(seq, msg))
+
+    def _emit(self, msgs):
+        for msg in msgs:
+            try:
+                self.text_queue.put_nowait(json.dumps(msg))
+            except queue.Full:
+                logger.warning("[ASRPool] text_queue 已满，丢弃识别结果")
+
+    def start(self):
+        self._stop_event.clear()
+        threading.Thread(target=self.collect, daemon=True).start()
+        threading.Thread(target=self.dispatch, daemon=True).start()
+        logger.info(f"[ASRPool] 分发 {len(self.worker_queues)} 个工作进程，方式: {self.mode}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def run(kwargs):
+    from utils.loger_util import init_subprocess_logger
+    import os
+    init_subprocess_logger(os.path.join(cfg.get("app", "save_dir"), "log"), "asr_dispatch")
+    dispatcher = AsrDispatcher(
+        kwargs['audio_queue'], kwargs['worker_queues'], kwargs['result_queue'], kwargs['text_queue'],
+        audio_stats=kwargs.get('audio_stats'),
+        mode=cfg.get("process", "asr_dispatch", "stream"),
+    )
+    dispatcher.start()
+    # 池内进程不读 control_queue，避免抢走录音进程的命令；作为守护进程随主进程退出
+    while True:
+        time.sleep(1)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+压缩音频归档
+与 WavArchiveWriter 相同的轮转和病例切换逻辑，只替换文件格式：
+  flac: 无损，soundfile 编码，约为 WAV 的 1/2
+  opus: 有损，工程自带 libopus 编码为 Ogg Opus，约为 WAV 的 1/10 以上
+编码在录音器的保存线程里进行，save 队列有界，内存占用恒定；
+两种格式都可以由 FileSource 回放进 ASR 重新识别。
+"""
+import os
+
+import numpy as np
+from loguru import logger
+
+from voice.wav_archive import WavArchiveWriter
+
+ARCHIVE_FORMATS = ("wav", "flac", "opus")
+
+
+class FlacArchiveWriter(WavArchiveWriter):
+    suffix = "flac"
+
+    def _open_file(self, path):
+        import soundfile
+        self._file = soundfile.SoundFile(path, "w", samplerate=self.sample_rate, channels=1,
+                                         format="FLAC", subtype="PCM_16")
+
+    def _append(self, block: np.ndarray):
+        self._file.write(block)
+
+    def _would_exceed(self, block: np.ndarray) -> bool:
+        return os.path.getsize(self.filepath) >= self.rotate_bytes
+
+    def _close_file(self):
+        self._file.close()
+
+    def flush(self):
+        if self._file is None or self._flushed_bytes == self._data_bytes:
+            return
+        self._file.flush()
+        self._flushed_bytes = self._data_bytes
+
+
+class OpusArchiveWriter(WavArchiveWriter):
+    suffix = "opus"
+
+    def _open_file(self, path):
+        from voice.opus_codec import OpusEncoder, OggOpusStream
+        self._encoder = OpusEncoder(self.sample_rate)
+        self._file = open(path, "wb")
+        self._ogg = OggOpusStream(self._file, self.sample_rate)
+        # 不足一帧（20ms）的尾巴留到下次写入
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    def _append(self, block: np.ndarray):
+        data = np.concatenate([self._pending, block]) if len(self._pending) else block
+        n = self._encoder.frame_size
+        full = len(data) // n * n
+        for i in range(0, full, n):
+            self._ogg.add_packet(self._encoder.encode(data[i:i + n]), n)
+        self._pending = data[full:].copy()
+
+    def _would_exceed(self, block: np.ndarray) -> bool:
+        return self._file.tell() >= self.rotate_bytes
+
+    def _close_file(self):
+        n = len(self._pending)
+        if n:
+            frame = np.zeros(self._encoder.frame_size, dtype=np.int16)
+            frame[:n] = self._pending
+            self._ogg.add_packet(self._encoder.encode(frame), n)
+            self._pending = self._pending[:0]
+        self._ogg.flush_page(eos=True)
+        self._file.close()
+        self._encoder.close()
+
+    def flush(self):
+        """写出已编码的 Ogg 页；文件在任意 flush 之后都可以解码到该位置"""
+        if self._file is None or self._flushed_bytes == self._data_bytes:
+            return
+        self._ogg.flush_page()
+        self._file.flush()
+        self._flushed_bytes = self._data_bytes
+
+
+def create_archive_writer(fmt: str, save_dir: str, **kwargs) -> WavArchiveWriter:
+    """按 archive.format 创建归档写入器，opus 不可用时回退到 flac"""
+    if fmt == "opus":
+        try:
+            from voice.opus_codec import load_libopus
+            load_libopus()
+            return OpusArchiveWriter(save_dir, **kwargs)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"libopus 不可用，改用 flac 归档: {e}")
+            fmt = "flac"
+    if fmt == "flac":
+        return FlacArchiveWriter(save_dir, **kwargs)
+    if fmt != "wav":
+        logger.warning(f"未知归档格式: {fmt}，使用 wav")
+    return WavArchiveWriter(save_dir, **kwargs)
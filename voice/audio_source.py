@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+音频输入源
+VoiceRecorder 通过统一的回调 callback(indata, frames, time, status) 接收 int16 (frames, 1) 数据块：
+  MicSource: 麦克风（sounddevice.InputStream）
+  SharedInputStream: 多诊室共用一个多声道设备时，设备只打开一次，按声道分发给各 MicSource
+  FileSource: 回放 WAV/FLAC/Opus 归档文件，可按实时速度或尽可能快地推送，
+              用于无声卡的 Linux 上做可复现的吞吐/延迟测试和批量重处理
+"""
+import threading
+import time
+
+import numpy as np
+from loguru import logger
+
+
+class SharedInputStream:
+    def __init__(self, device=None, channels: int = 1, sample_rate: int = 16000, blocksize: int = 1600):
+        """
+        Args:
+            device: 输入设备编号，None 为系统默认
+            channels: 打开的声道数，需覆盖所有订阅者使用的声道
+        """
+        self.device = device
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.stream = None
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def _callback(self, indata, frames, time, status):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for channel, callback in subscribers:
+            callback(indata[:, channel:channel + 1], frames, time, status)
+
+    def subscribe(self, key, channel: int, callback):
+        """第一个订阅者到来时打开设备；key 区分订阅者（同一声道可有多个）"""
+        import sounddevice as sd
+        with self._lock:
+            self._subscribers[key] = (channel, callback)
+            if self.stream is not None:
+                return
+            self.stream = sd.InputStream(
+                samplerate=self.sample_rate,
+                channels=self.channels,
+                dtype='int16',
+                callback=self._callback,
+                blocksize=self.blocksize,
+                device=self.device
+            )
+        self.stream.start()
+        logger.info(f"输入设备 {self.device} 已打开（{self.channels} 声道，共享）")
+
+    def unsubscribe(self, key):
+        """最后一个订阅者离开时关闭设备"""
+        with self._lock:
+            self._subscribers.pop(key, None)
+            if self._subscribers or self.stream is None:
+                return
+            stream, self.stream = self.stream, None
+        stream.stop()
+        stream.close()
+
+
+class MicSource:
+    realtime = True
+
+    def __init__(self, device=None, sample_rate: int = 16000, blocksize: int = 1600, channel: int = 0,
+                 shared: SharedInputStream = None):
+        """
+        Args:
+            device: 输入设备编号，None 为系统默认
+            channel: 使用设备的第几个输入声道（多声道阵列按声道区分诊室时使用）
+            shared: 与其他诊室共用的设备输入流，给出时不再单独打开设备
+        """
+        self.device = device
+        self.channel = channel
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.shared = shared
+        self.stream = None
+
+    def start(self, callback):
+        if self.shared is not None:
+            self.shared.subscribe(self, self.channel, callback)
+            return
+        import sounddevice as sd
+        if self.channel:
+            channel = self.channel
+            user_callback = callback
+
+            def callback(indata, frames, time, status):
+                user_callback(indata[:, channel:channel + 1], frames, time, status)
+        self.stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=self.channel + 1,
+            dtype='int16',
+            callback=callback,
+            blocksize=self.blocksize,
+            device=self.device
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.shared is not None:
+            self.shared.unsubscribe(self)
+            return
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class FileSource:
+    def __init__(self, path: str, realtime: bool = True, sample_rate: int = 16000, blocksize: int = 1600):
+        """
+        Args:
+            path: WAV/FLAC/Opus 文件路径
+            realtime: True 按音频时长节奏推送，False 尽可能快地推送
+            sample_rate: 输出采样率，文件采样率不同时会重采样
+            blocksize: 每次回调的样本数，与麦克风保持一致
+        """
+        self.path = str(path)
+        self.realtime = realtime
+        self.sample_rate = sample_rate
+        self.blocksize = blocksize
+        self.finished = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.pushed_samples = 0
+
+    def _blocks(self):
+        import soundfile
+
+        if self.path.endswith(".opus"):
+            # 录音归档的 Ogg Opus 用自带 libopus 解码
+            from voice.opus_codec import read_ogg_opus
+            pcm, sr = read_ogg_opus(self.path)
+            mono = pcm.astype(np.float32) / 32768 if sr != self.sample_rate else None
+        else:
+            info = soundfile.info(self.path)
+            if info.samplerate == self.sample_rate:
+                for block in soundfile.blocks(self.path, blocksize=self.blocksize, dtype='int16', always_2d=True):
+                    yield block[:, :1]
+                return
+            data, sr = soundfile.read(self.path, dtype='float32', always_2d=True)
+            mono = data[:, 0]
+
+        if sr != self.sample_rate:
+            # 采样率不一致时整体读入重采样
+            import resampy
+            mono = resampy.resample(mono, sr, self.sample_rate)
+            pcm = np.clip(mono * 32768, -32768, 32767).astype(np.int16)
+        for i in range(0, len(pcm), self.blocksize):
+            yield pcm[i:i + self.blocksize, None]
+
+    def _run(self, callback):
+        start = time.monotonic()
+        try:
+            for block in self._blocks():
+                if self._stop_event.is_set():
+                    break
+                if len(block) < self.blocksize:
+                    block = np.pad(block, ((0, self.blocksize - len(block)), (0, 0)))
+                callback(block, len(block), None, None)
+                self.pushed_samples += len(block)
+                if self.realtime:
+                    delay = start + self.pushed_samples / self.sample_rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+        except Exception as e:
+            logger.error(f"回放音频文件失败 {self.path}: {e}")
+        finally:
+            self.finished.set()
+            logger.info(f"音频文件回放结束: {self.path} ({self.pushed_samples / self.sample_rate:.1f}s)")
+
+    def start(self, callback):
+        self._stop_event.clear()
+        self.finished.clear()
+        self.pushed_samples = 0
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None) -> bool:
+        return self.finished.wait(timeout)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+audio_queue 背压控制
+ASR 跟不上时，录音侧不再静默丢掉整批帧，而是按策略处理并计数：
+  drop_oldest: 队列满时语音段暂存在本地积压区，积压区满了丢最旧的段（保留 final 标记）
+  merge: 积压区满时把新段并入最后一个未 final 的段，减少消息数
+  skip_speaker: 达到高水位时先跳过录音侧声纹识别降载，队列满后按 drop_oldest 处理
+统计量放在共享内存里，ASR 进程和 UI 都可以读取，用于按数据调整 process.audio_queue_size。
+"""
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import Array
+
+import numpy as np
+from loguru import logger
+
+POLICIES = ("drop_oldest", "merge", "skip_speaker")
+
+
+class AudioQueueStats:
+    """跨进程共享的 audio_queue 统计"""
+
+    FIELDS = ("enqueued", "consumed", "dropped", "merged", "skipped_speaker",
+              "backlog", "max_depth", "high_watermark")
+
+    def __init__(self):
+        self._values = Array("q", len(self.FIELDS))
+        self._index = {name: i for i, name in enumerate(self.FIELDS)}
+
+    def incr(self, name: str, n: int = 1):
+        with self._values.get_lock():
+            self._values[self._index[name]] += n
+
+    def set(self, name: str, value: int):
+        self._values[self._index[name]] = int(value)
+
+    def get(self, name: str) -> int:
+        return self._values[self._index[name]]
+
+    @property
+    def depth(self) -> int:
+        """队列中尚未被 ASR 取走的段数"""
+        return self.get("enqueued") - self.get("consumed")
+
+    def snapshot(self) -> dict:
+        with self._values.get_lock():
+            data = {name: self._values[i] for name, i in self._index.items()}
+        data["depth"] = data["enqueued"] - data["consumed"]
+        return data
+
+    def reset(self):
+        with self._values.get_lock():
+            for i in range(len(self.FIELDS)):
+                self._values[i] = 0
+
+
+class BackpressureSender:
+    def __init__(self, audio_queue, maxsize: int, stats: AudioQueueStats = None,
+                 policy: str = "drop_oldest", backlog_size: int = 20,
+                 high_watermark: float = 0.8, max_merge_samples: int = 16000 * 30,
+                 stream_id=None):
+        """
+        Args:
+            audio_queue: Queue 或 SharedAudioQueue
+            maxsize: 队列容量，用于计算高水位
+            stats: 共享统计，为 None 时在本进程内新建
+            policy: drop_oldest / merge / skip_speaker
+            backlog_size: 本地积压区能容纳的段数
+            high_watermark: 队列深度占容量的比例达到该值时置高水位
+            max_merge_samples: merge 策略下单段合并后的最大长度
+            stream_id: 多路录音时附加在每个语音段后的音频流标识
+        """
+        if policy not in POLICIES:
+            logger.warning(f"未知背压策略: {policy}，使用 drop_oldest")
+            policy = "drop_oldest"
+        self.audio_queue = audio_queue
+        self.policy = policy
+        self.stats = stats if stats is not None else AudioQueueStats()
+        self.backlog_size = backlog_size
+        self.high_level = max(1, int(maxsize * high_watermark))
+        self.max_merge_samples = max_merge_samples
+        self.stream_id = stream_id
+        self._backlog = deque()
+        self._reported_backlog = 0
+        self._lock = threading.Lock()
+
+    def send(self, block, is_final, speaker):
+        """发送一个语音段；不阻塞，不抛 queue.Full"""
+        with self._lock:
+            if len(self._backlog) >= self.backlog_size:
+                self._overflow(block, is_final, speaker)
+            else:
+                self._backlog.append([block, is_final, speaker])
+            self._drain()
+
+    def drain(self):
+        """把积压区的段尽量送入队列，录音线程空闲时定期调用"""
+        with self._lock:
+            if self._backlog:
+                self._drain()
+
+    def close(self, timeout: float = 2) -> int:
+        """停止录音时调用：在 timeout 内尽量送出积压区，剩余的段计入丢弃并清空，返回丢弃段数"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self._backlog:
+                    self._drain()
+                remaining = len(self._backlog)
+                if not remaining or time.monotonic() >= deadline:
+                    self._backlog.clear()
+                    self._drain()
+                    break
+            time.sleep(0.01)
+        if remaining:
+            self.stats.incr("dropped", remaining)
+            logger.warning(f"停止录音时 audio_queue 仍有 {remaining} 段积压未送出，已丢弃")
+        return remaining
+
+    def degrade_speaker_id(self) -> bool:
+        """skip_speaker 策略下，高水位时返回 True 表示本段跳过声纹识别"""
+        if self.policy != "skip_speaker" or not self.stats.get("high_watermark"):
+            return False
+        self.stats.incr("skipped_speaker")
+        return True
+
+    def _overflow(self, block, is_final, speaker):
+        last = self._backlog[-1]
+        if (self.policy == "merge" and not last[1]
+                and len(last[0]) + len(block) <= self.max_merge_samples):
+            last[0] = np.concatenate([last[0], block])
+            last[1] = is_final
+            last[2] = speaker
+            self.stats.incr("merged")
+            return
+        self._drop_oldest()
+        self._backlog.append([block, is_final, speaker])
+
+    def _drop_oldest(self):
+        oldest = self._backlog[0]
+        self.stats.incr("dropped")
+        if oldest[1] and len(oldest[0]):
+            # 丢音频但保留句末标记，避免 ASR 把前后两句拼在一起
+            oldest[0] = np.array([], dtype=np.int16)
+        else:
+            self._backlog.popleft()
+        logger.warning(f"audio_queue 积压，丢弃最旧语音段（累计 {self.stats.get('dropped')}）")
+
+    def _drain(self):
+        while self._backlog:
+            block, is_final, speaker = self._backlog[0]
+            item = (block, is_final, speaker)
+            if self.stream_id is not None:
+                item += (self.stream_id,)
+            try:
+                self.audio_queue.put_nowait(item)
+            except queue.Full:
+                break
+            self._backlog.popleft()
+            self.stats.incr("enqueued")
+        depth = self.stats.depth
+        # 多路录音共用一份统计，积压数按增量累加
+        self.stats.incr("backlog", len(self._backlog) - self._reported_backlog)
+        self._reported_backlog = len(self._backlog)
+        if depth > self.stats.get("max_depth"):
+            self.stats.set("max_depth", depth)
+        high = bool(self._backlog) or depth >= self.high_level
+        if high != bool(self.stats.get("high_watermark")):
+            self.stats.set("high_watermark", high)
+            logger.info(f"audio_queue {'达到' if high else '回落到'}高水位，深度: {depth}，积压: {len(self._backlog)}")
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+自适应端点检测
+输入 APM 之后的音频块和每 10ms 帧的 VAD 结果，输出带采样点级起止偏移的语音段：
+  - 静音阈值随语句时长线性收缩（utils.common.get_dynamic_silence_limit），长句更快断句
+  - 超过最大时长强制切分（非 final），交给 ASR 累积
+  - 语音起点前保留一小段预滚音频，避免字头被截掉
+离线调试：python -m voice.endpointer some.wav
+"""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from utils.common import get_dynamic_silence_limit
+from voice.ring_buffer import RingBuffer
+
+FRAME_LEN = 160  # 10ms @ 16kHz
+STREAM_CHUNK_MS = 600  # 流式 paraformer 的默认送入粒度
+
+
+@dataclass
+class EndpointPolicy:
+    partial_silence_frames: int = 10   # 静音达到该帧数时先把已积累的语音送出（非 final）
+    final_silence_frames: int = 20     # 语句开始时的断句静音帧数
+    min_final_silence_frames: int = 6  # 长句收缩后的最小断句静音帧数
+    decay_seconds: float = 10          # 语句持续到该时长时，阈值收缩到最小值
+    max_segment_seconds: float = 15    # 单段最大时长，超过后强制切分
+    preroll_ms: int = 200              # 语音起点前保留的音频
+    stream_chunk_ms: int = 0           # 流式 ASR 时语音持续期间每隔该时长送出一段，0 表示用 STREAM_CHUNK_MS
+
+    @classmethod
+    def from_cfg(cls, section: dict):
+        fields = cls.__dataclass_fields__
+        return cls(**{k: v for k, v in (section or {}).items() if k in fields})
+
+
+@dataclass
+class Segment:
+    audio: np.ndarray
+    start: int          # 起始采样点（相对录音开始）
+    end: int            # 结束采样点（不含）
+    is_final: bool = False
+
+
+class Endpointer:
+    def __init__(self, policy: EndpointPolicy = None, sample_rate: int = 16000, streaming: bool = False):
+        """
+        Args:
+            streaming: 下游为流式 ASR（funasr/onnx 且 asr.streaming 开启）时才按 stream_chunk_ms 分块，
+                       其他引擎整句识别，分块只会增加开销和声纹误判
+        """
+        self.policy = policy or EndpointPolicy()
+        self.sample_rate = sample_rate
+        self.max_segment_len = int(self.policy.max_segment_seconds * sample_rate)
+        chunk_ms = (self.policy.stream_chunk_ms or STREAM_CHUNK_MS) if streaming else 0
+        self.stream_chunk_len = int(chunk_ms * sample_rate / 1000) or self.max_segment_len
+        self.preroll_len = int(self.policy.preroll_ms * sample_rate / 1000) // FRAME_LEN * FRAME_LEN
+        # 当前语音段（含段内短静音），容量覆盖最大段长 + 预滚
+        self._segment = RingBuffer(self.max_segment_len + self.preroll_len + FRAME_LEN)
+        self._preroll = RingBuffer(max(self.preroll_len, FRAME_LEN))
+        self.reset()
+
+    def reset(self):
+        self._segment.clear()
+        self._preroll.clear()
+        self._pos = 0              # 已处理的采样点数
+        self._seg_start = 0        # 当前段起点
+        self._last_speech_end = 0  # 当前段内最后一个语音帧的结束位置
+        self._utt_start = None     # 当前语句起点，None 表示不在语句中
+        self._silence = 0
+
+    def _silence_limits(self):
+        p = self.policy
+        duration = (self._pos - self._utt_start) / self.sample_rate
+        final = get_dynamic_silence_limit(
+            duration, base_limit=p.final_silence_frames,
+            min_limit=p.min_final_silence_frames, max_duration=p.decay_seconds,
+        )
+        return min(p.partial_silence_frames, final), final
+
+    def _emit(self, end: int, is_final: bool) -> Segment:
+        """送出 [seg_start, end) 的音频，剩余部分（段尾静音）留在缓冲区"""
+        n = end - self._seg_start
+        audio = self._segment.peek(n).copy() if n > 0 else np.array([], dtype=np.int16)
+        seg = Segment(audio, self._seg_start, end, is_final)
+        self._segment.advance(n)
+        self._seg_start = end
+        return seg
+
+    def process(self, block: np.ndarray, flags) -> List[Segment]:
+        """
+        Args:
+            block: int16 音频，长度为 len(flags) * 160
+            flags: 每帧是否为语音
+
+        Returns:
+            本块内完成的语音段列表
+        """
+        out = []
+        for i, speech in enumerate(flags):
+            frame = block[i * FRAME_LEN:(i + 1) * FRAME_LEN]
+            frame_start = self._pos
+            self._pos += FRAME_LEN
+
+            if self._utt_start is None:
+                if not speech:
+                    if self.preroll_len:
+                        if len(self._preroll) + FRAME_LEN > self.preroll_len:
+                            self._preroll.advance(FRAME_LEN)
+                        self._preroll.write(frame)
+                    continue
+                # 语句开始：预滚音频 + 当前帧
+                pre = len(self._preroll)
+                self._segment.clear()
+                if pre:
+                    self._segment.write(self._preroll.peek(pre))
+                    self._preroll.clear()
+                self._utt_start = frame_start - pre
+                self._seg_start = self._utt_start
+
+            self._segment.write(frame)
+            if speech:
+                self._silence = 0
+                self._last_speech_end = self._pos
+                if self._pos - self._seg_start >= min(self.max_segment_len, self.stream_chunk_len):
+                    out.append(self._emit(self._pos, False))
+                continue
+
+            self._silence += 1
+            partial_limit, final_limit = self._silence_limits()
+            if self._silence >= final_limit:
+                out.append(self._finish())
+                continue
+            over_length = self._pos - self._seg_start >= self.max_segment_len
+            if self._last_speech_end > self._seg_start:
+                if self._silence >= partial_limit or over_length:
+                    out.append(self._emit(self._last_speech_end, False))
+            elif over_length:
+                # 段内只剩静音却已到长度上限，丢弃静音部分
+                self._segment.advance(self._pos - self._seg_start)
+                self._seg_start = self._pos
+        return out
+
+    def _finish(self) -> Segment:
+        end = max(self._last_speech_end, self._seg_start)
+        seg = self._emit(end, True)
+        self._segment.clear()
+        self._preroll.clear()
+        self._utt_start = None
+        self._silence = 0
+        return seg
+
+    def flush(self) -> List[Segment]:
+        """录音结束时送出未完成的语句"""
+        if self._utt_start is None:
+            return []
+        return [self._finish()]
+
+
+def segment_wav(path: str, vad_mode: str = "webrtc", policy: EndpointPolicy = None) -> List[Segment]:
+    """离线对 16kHz 单声道 int16 WAV 文件做端点检测"""
+    import wave
+    from voice.vad import create_vad
+
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != 16000 or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError("only 16kHz mono int16 wav is supported")
+        audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+    vad = create_vad(vad_mode)
+    ep = Endpointer(policy)
+    segments = []
+    block = FRAME_LEN * 10
+    for i in range(0, len(audio) // FRAME_LEN * FRAME_LEN, block):
+        chunk = audio[i:i + block]
+        chunk = chunk[:len(chunk) // FRAME_LEN * FRAME_LEN]
+        segments += ep.process(chunk, vad.classify(chunk))
+    segments += ep.flush()
+    return segments
+
+
+if __name__ == "__main__":
+    import sys
+
+    for seg in segment_wav(sys.argv[1], *(sys.argv[2:3])):
+        print(f"{seg.start / 16000:8.2f}s - {seg.end / 16000:8.2f}s  "
+              f"{'final' if seg.is_final else 'part '}  {len(seg.audio)} samples")
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+诊所热词表（品种、药名、检查项目等）
+热词来自配置库 asr.hotwords 和可选的文本文件 asr.hotword_file（每行一个词），
+按引擎预处理一次并缓存，只有热词表变化时才重新编译：
+  nano:       FunASRNano 的提示词前缀
+  paraformer: funasr generate 的 hotword 文件（SeACo/Contextual paraformer 生效，其他模型忽略）
+  vosk:       KaldiRecognizer 的 grammar JSON（含 [unk]）
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from settings import cfg
+
+HOTWORD_DIR = Path.home() / ".vetvoice" / "hotwords"
+
+
+class HotwordTable:
+    def __init__(self, check_interval: float = 5.0):
+        """
+        Args:
+            check_interval: 两次检查热词来源是否变化的最小间隔（秒），识别热路径上不反复读库
+        """
+        self.check_interval = check_interval
+        self.words = []
+        self.version = 0
+        self._signature = None
+        self._checked_at = 0.0
+        self._compiled = {}
+        self.refresh(force=True)
+
+    def _load(self):
+        words = list(cfg.get("asr", "hotwords", []) or [])
+        path = cfg.get("asr", "hotword_file", "")
+        mtime = None
+        if path and os.path.isfile(path):
+            mtime = os.path.getmtime(path)
+            with open(path, encoding="utf-8") as f:
+                words += [line.strip() for line in f]
+        # 去空、去重并保持顺序
+        words = list(dict.fromkeys(w for w in words if w))
+        return words, (tuple(words), path, mtime)
+
+    def refresh(self, force: bool = False) -> bool:
+        """热词来源变化时清空编译缓存，返回是否变化"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        words, signature = self._load()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.words = words
+        self._compiled.clear()
+        self.version += 1
+        logger.info(f"[Hotword] 热词表更新（{len(words)} 个）")
+        return True
+
+    def compiled(self, engine: str):
+        """返回某引擎所需形式的热词，没有热词时返回 None"""
+        self.refresh()
+        if not self.words:
+            return None
+        if engine not in self._compiled:
+            self._compiled[engine] = getattr(self, f"_compile_{engine}")()
+        return self._compiled[engine]
+
+    def _compile_nano(self) -> str:
+        from model import build_hotword_prompt
+        return build_hotword_prompt(self.words)
+
+    def _compile_paraformer(self) -> str:
+        HOTWORD_DIR.mkdir(parents=True, exist_ok=True)
+        path = HOTWORD_DIR / "paraformer.txt"
+        # 多个 ASR 工作进程会同时编译，先写本进程的临时文件再原子替换，避免读到写了一半的文件
+        tmp = HOTWORD_DIR / f"paraformer.txt.{os.getpid()}.tmp"
+        tmp.write_text("\n".join(self.words) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+        return str(path)
+
+    def _compile_vosk(self) -> str:
+        # vosk 按空格分词，grammar 中保留 [unk] 以免词表外的内容被强行匹配
+        return json.dumps(self.words + ["[unk]"], ensure_ascii=False)
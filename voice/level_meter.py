@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+波形显示用的电平包络
+录音线程按 10ms 帧计算 RMS/峰值；音频按 ~100ms 的块到达，如果到达时直接发送，实际刷新只有约 10Hz。
+因此各帧先进入待发队列，由定时线程按真实时间节奏逐帧放出，以固定频率（默认 30Hz）
+把最近一段包络（float32, 形状 (2, N)）发给 UI，显示延迟约一个音频块。
+代替原来通过 Pipe 传整段 int16 PCM。
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+FRAME_LEN = 160  # 10ms @ 16kHz
+FRAME_SECONDS = 0.01
+
+
+class LevelMeter:
+    def __init__(self, send_fn, rate_hz: float = 30, window_frames: int = 20, max_lag_frames: int = 20):
+        """
+        Args:
+            send_fn: 发送包络的函数，如 Pipe 的 send
+            rate_hz: 发送频率
+            window_frames: 每次发送的包络帧数（默认 200ms）
+            max_lag_frames: 待发帧超过该数量（处理卡顿后积压）时直接追上，不再按节奏放出
+        """
+        self.send_fn = send_fn
+        self.interval = 1.0 / rate_hz
+        self.window_frames = window_frames
+        self.max_lag_frames = max_lag_frames
+        # [0] RMS, [1] 峰值，归一化到 0~1；按时间顺序滚动
+        self._envelope = np.zeros((2, window_frames), dtype=np.float32)
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def update(self, block: np.ndarray):
+        """输入一块 int16 音频（长度为 160 的整数倍），逐帧放入待发队列"""
+        n = len(block) // FRAME_LEN
+        if n == 0:
+            return
+        frames = block[:n * FRAME_LEN].reshape(n, FRAME_LEN).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768.0
+        peak = np.abs(frames).max(axis=1) / 32768.0
+        with self._lock:
+            self._pending.extend(zip(rms, peak))
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _release(self, n: int) -> bool:
+        """把最多 n 帧从待发队列移入包络，返回是否有新帧"""
+        with self._lock:
+            if len(self._pending) > self.max_lag_frames:
+                n = len(self._pending)
+            n = min(n, len(self._pending))
+            frames = [self._pending.popleft() for _ in range(n)]
+        if not frames:
+            return False
+        n = min(n, self.window_frames)
+        self._envelope = np.roll(self._envelope, -n, axis=1)
+        self._envelope[:, -n:] = np.asarray(frames[-n:], dtype=np.float32).T
+        return True
+
+    def _run(self):
+        last = time.monotonic()
+        credit = 0.0
+        while not self._stop_event.wait(self.interval):
+            now = time.monotonic()
+            # 额度按真实时间累积并封顶；无待发帧时本轮额度随之消耗，不会在下一块到达时一次放出
+            credit = min(credit + (now - last) / FRAME_SECONDS, self.max_lag_frames)
+            last = now
+            n = int(credit)
+            credit -= n
+            if self._release(n):
+                self.send_fn(self._envelope.copy())
+
+    def reset(self):
+        """停止录音：停止定时发送，清空包络并通知 UI 进入空闲状态"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        with self._lock:
+            self._pending.clear()
+        self._envelope[:] = 0
+        self.send_fn(np.zeros((2, 0), dtype=np.float32))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+ONNX Runtime 版 paraformer（CPU，int8 动态量化）
+无 GPU 的 Linux 诊室机器上替代 torch 的 funasr.AutoModel。用 funasr_onnx 加载模型目录下的
+model_quant.onnx，文件不存在时 funasr_onnx 会调用 funasr 从 model.pt 导出并量化（只在首次）。
+流式和整句识别需要不同的导出（ParaformerStreaming / Paraformer），分别使用
+asr.model_onnx_path 和 asr.model_onnx_offline_path 两个目录。
+对外提供与 AutoModel.generate 相同的调用方式和返回格式，StreamVadAsr 的流式、合批和预热逻辑无需改动。
+"""
+import os
+import re
+
+import numpy as np
+from loguru import logger
+
+
+def _text(result) -> str:
+    """funasr_onnx 不同版本的 preds 可能是字符串或 (文本, 分词) 元组"""
+    preds = result.get("preds", "") if isinstance(result, dict) else result
+    if isinstance(preds, (list, tuple)):
+        preds = preds[0] if preds else ""
+    return str(preds).strip()
+
+
+def _model_class(model_dir: str) -> str:
+    """读取模型目录 config.yaml 中的 model 字段，读不到时返回空字符串"""
+    try:
+        with open(os.path.join(model_dir, "config.yaml"), encoding="utf-8") as f:
+            m = re.search(r"^model:\s*(\S+)", f.read(), re.M)
+    except OSError:
+        return ""
+    return m.group(1) if m else ""
+
+
+class OnnxParaformer:
+    def __init__(self, model_dir: str, streaming: bool = True,
+                 intra_op_threads: int = 4, quantize: bool = True):
+        """
+        Args:
+            model_dir: paraformer 模型目录（与 funasr 引擎共用）
+            streaming: True 使用在线（流式）模型，需配合 cache 逐块调用
+            intra_op_threads: onnxruntime 单算子线程数
+            quantize: 使用 int8 动态量化模型
+        """
+        model_class = _model_class(model_dir)
+        if model_class and ("Streaming" in model_class) != streaming:
+            raise ValueError(
+                f"{model_dir} 是 {model_class} 模型，不能用于{'流式' if streaming else '整句'}识别，"
+                f"请使用 asr.{'model_onnx_path' if streaming else 'model_onnx_offline_path'} 指向的模型目录"
+            )
+        self.streaming = streaming
+        if streaming:
+            from funasr_onnx.paraformer_online_bin import Paraformer
+            # 在线模型默认 chunk_size [5, 10, 5]，每块 600ms，与 StreamVadAsr.chunk_stride 一致
+            self.model = Paraformer(model_dir, batch_size=1, quantize=quantize,
+                                    intra_op_num_threads=intra_op_threads)
+        else:
+            from funasr_onnx import Paraformer
+            self.model = Paraformer(model_dir, batch_size=1, quantize=quantize,
+                                    intra_op_num_threads=intra_op_threads)
+        logger.info(f"[ONNX] 加载 paraformer: {model_dir}，流式: {streaming}，量化: {quantize}，"
+                    f"线程: {intra_op_threads}")
+
+    def generate(self, input, fs=16000, cache=None, is_final=True, batch_size=1, **kwargs):
+        """
+        与 AutoModel.generate 对齐：input 为单段 float32 数组或数组列表，返回 [{"text": ...}]
+        流式模式下 cache 由调用方在整句内保留
+        """
+        batch = input if isinstance(input, list) else [input]
+        batch = [np.asarray(a, dtype=np.float32) for a in batch]
+        if self.streaming:
+            cache = cache if cache is not None else {}
+            out = []
+            for audio in batch:
+                res = self.model(audio_in=audio, param_dict={"cache": cache, "is_final": is_final})
+                out.append({"text": "".join(_text(r) for r in res)})
+            return out
+        # funasr_onnx 的列表输入只接受文件路径，内存数组逐段识别
+        return [{"text": "".join(_text(r) for r in self.model(audio))} for audio in batch]
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+libopus 编解码（ctypes）和最小 Ogg 封装
+录音归档用 20ms 帧、VOIP 模式编码 16kHz 单声道，libopus 默认码率约 19kbps，
+约为 PCM（256kbps）的 1/13。写出标准 Ogg Opus（RFC 7845），播放器和 ffmpeg 可直接打开；
+read_ogg_opus 解码回 int16，供 FileSource 回放进 ASR。
+"""
+import ctypes
+import ctypes.util
+import os
+import struct
+from ctypes import c_void_p, c_int, c_int32, POINTER, byref, c_char_p
+
+import numpy as np
+
+from utils.common import get_libopus_path
+from utils.resource_path import get_project_root
+
+OPUS_APPLICATION_VOIP = 2048
+# Ogg Opus 的 granule position 固定按 48kHz 计
+GRANULE_RATE = 48000
+# libopus 编码延迟 6.5ms（48kHz 下 312 样本），写进 OpusHead 的 pre_skip
+PRE_SKIP = 312
+MAX_PACKET_BYTES = 1500
+MAX_FRAME_SAMPLES_48K = 5760  # 120ms
+
+_lib = None
+
+
+def load_libopus():
+    """优先加载工程自带的 libopus，Linux 等没有预编译库的平台回退到系统库"""
+    global _lib
+    if _lib is not None:
+        return _lib
+    path = None
+    try:
+        path = get_libopus_path(str(get_project_root() / "libs" / "libopus"))
+    except RuntimeError:
+        pass
+    if path is None or not os.path.exists(path):
+        path = ctypes.util.find_library("opus")
+    if not path:
+        raise RuntimeError("未找到 libopus，请安装系统 libopus 或使用 flac 归档格式")
+    lib = ctypes.cdll.LoadLibrary(path)
+
+    lib.opus_encoder_create.argtypes = [c_int32, c_int, c_int, POINTER(c_int)]
+    lib.opus_encoder_create.restype = c_void_p
+    lib.opus_encoder_destroy.argtypes = [c_void_p]
+    lib.opus_encode.argtypes = [c_void_p, c_void_p, c_int, c_void_p, c_int32]
+    lib.opus_encode.restype = c_int32
+    lib.opus_decoder_create.argtypes = [c_int32, c_int, POINTER(c_int)]
+    lib.opus_decoder_create.restype = c_void_p
+    lib.opus_decoder_destroy.argtypes = [c_void_p]
+    lib.opus_decode.argtypes = [c_void_p, c_char_p, c_int32, c_void_p, c_int, c_int]
+    lib.opus_decode.restype = c_int
+    _lib = lib
+    return lib
+
+
+class OpusEncoder:
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20):
+        self.lib = load_libopus()
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        err = c_int(0)
+        self._st = self.lib.opus_encoder_create(sample_rate, 1, OPUS_APPLICATION_VOIP, byref(err))
+        if not self._st or err.value != 0:
+            raise RuntimeError(f"opus_encoder_create failed: {err.value}")
+        self._out = np.empty(MAX_PACKET_BYTES, dtype=np.uint8)
+
+    def encode(self, frame: np.ndarray) -> bytes:
+        """编码一帧（frame_size 个 int16 样本），返回一个 Opus 包"""
+        frame = np.ascontiguousarray(frame, dtype=np.int16)
+        n = self.lib.opus_encode(self._st, frame.ctypes.data, self.frame_size,
+                                 self._out.ctypes.data, MAX_PACKET_BYTES)
+        if n < 0:
+            raise RuntimeError(f"opus_encode failed: {n}")
+        return self._out[:n].tobytes()
+
+    def close(self):
+        if self._st:
+            self.lib.opus_encoder_destroy(self._st)
+            self._st = None
+
+    def __del__(self):
+        self.close()
+
+
+class OpusDecoder:
+    def __init__(self, sample_rate: int = 16000):
+        self.lib = load_libopus()
+        self.sample_rate = sample_rate
+        err = c_int(0)
+        self._st = self.lib.opus_decoder_create(sample_rate, 1, byref(err))
+        if not self._st or err.value != 0:
+            raise RuntimeError(f"opus_decoder_create failed: {err.value}")
+        self._pcm = np.empty(MAX_FRAME_SAMPLES_48K * sample_rate // GRANULE_RATE, dtype=np.int16)
+
+    def decode(self, packet: bytes) -> np.ndarray:
+        n = self.lib.opus_decode(self._st, packet, len(packet), self._pcm.ctypes.data, len(self._pcm), 0)
+        if n < 0:
+            raise RuntimeError(f"opus_decode failed: {n}")
+        return self._pcm[:n].copy()
+
+    def close(self):
+        if self._st:
+            self.lib.opus_decoder_destroy(self._st)
+            self._st = None
+
+    def __del__(self):
+        self.close()
+
+
+# ================= Ogg 封装 =================
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        r = i << 24
+        for _ in range(8):
+            r = ((r << 1) ^ 0x04C11DB7) if r & 0x80000000 else (r << 1)
+        table.append(r & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _ogg_crc(data: bytes) -> int:
+    crc = 0
+    for b in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ b]
+    return crc
+
+
+class OggOpusStream:
+    """把 Opus 包按页写入已打开的二进制文件"""
+
+    def __init__(self, f, sample_rate: int = 16000, serial: int = 0x56455456):
+        self._f = f
+        self.sample_rate = sample_rate
+        self._serial = serial
+        self._seq = 0
+        self._packets = []
+        self._lacing = 0  # 当前页已占用的分段数，单页最多 255
+        self._granule = PRE_SKIP
+        head = struct.pack("<8sBBHIhB", b"OpusHead", 1, 1, PRE_SKIP, sample_rate, 0, 0)
+        vendor = b"VetVoice"
+        tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+        self._write_page([head], 0, bos=True)
+        self._write_page([tags], 0)
+
+    def _write_page(self, packets, granule, bos=False, eos=False):
+        lacing = bytearray()
+        for p in packets:
+            lacing += b"\xff" * (len(p) // 255) + bytes([len(p) % 255])
+        header_type = (2 if bos else 0) | (4 if eos else 0)
+        header = struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule,
+                             self._serial, self._seq, 0, len(lacing))
+        page = bytearray(header + lacing + b"".join(packets))
+        struct.pack_into("<I", page, 22, _ogg_crc(page))
+        self._f.write(page)
+        self._seq += 1
+
+    def add_packet(self, packet: bytes, samples: int):
+        """samples: 该包对应的输入采样点数（末帧可小于帧长，用于结尾裁剪）"""
+        # 每个包占 len // 255 + 1 个分段，放不下时先把已有的包写成一页（granule 为页内最后一个包的结束位置）
+        segments = len(packet) // 255 + 1
+        if self._lacing + segments > 255:
+            self.flush_page()
+        self._packets.append(packet)
+        self._lacing += segments
+        self._granule += samples * GRANULE_RATE // self.sample_rate
+        # 约 1 秒一页，控制崩溃时丢失的数据量
+        if len(self._packets) >= 50:
+            self.flush_page()
+
+    def flush_page(self, eos=False):
+        if self._packets or eos:
+            self._write_page(self._packets, self._granule, eos=eos)
+            self._packets = []
+            self._lacing = 0
+
+
+def _read_ogg_packets(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    pos = 0
+    pending = b""
+    last_granule = 0
+    packets = []
+    while pos + 27 <= len(data):
+        if data[pos:pos + 4] != b"OggS":
+            raise ValueError(f"不是 Ogg 文件或已损坏: {path} @ {pos}")
+        granule = struct.unpack_from("<q", data, pos + 6)[0]
+        n_seg = data[pos + 26]
+        lacing = data[pos + 27:pos + 27 + n_seg]
+        pos += 27 + n_seg
+        for seg in lacing:
+            pending += data[pos:pos + seg]
+            pos += seg
+            if seg < 255:
+                packets.append(pending)
+                pending = b""
+        if granule >= 0:
+            last_granule = granule
+    return packets, last_granule
+
+
+def read_ogg_opus(path) -> tuple:
+    """解码 Ogg Opus 文件，返回 (int16 数组, 采样率)；截断写入的文件只解码到最后一个完整页"""
+    packets, last_granule = _read_ogg_packets(path)
+    if len(packets) < 2 or not packets[0].startswith(b"OpusHead"):
+        raise ValueError(f"不是 Ogg Opus 文件: {path}")
+    _, _, channels, pre_skip, sample_rate, _, _ = struct.unpack_from("<8sBBHIhB", packets[0])
+    if channels != 1:
+        raise ValueError(f"只支持单声道归档: {path}")
+    sample_rate = sample_rate or 16000
+    decoder = OpusDecoder(sample_rate)
+    pcm = [decoder.decode(p) for p in packets[2:]]
+    decoder.close()
+    audio = np.concatenate(pcm) if pcm else np.zeros(0, dtype=np.int16)
+    ratio = GRANULE_RATE // sample_rate
+    total = max(0, (last_granule - pre_skip) // ratio)
+    return audio[pre_skip // ratio:pre_skip // ratio + total], sample_rate
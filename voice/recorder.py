@@ -1,47 +1,90 @@
 # -*- coding: utf-8 -*-
-import sounddevice as sd
 import numpy as np
 import threading
-import wave
 import queue
 from loguru import logger
 from voice.webrtc_apm_lite import WebRtcApmLite
+from voice.ring_buffer import RingBuffer
+from voice.speaker_tagger import SpeakerTagger
+from voice.audio_archive import create_archive_writer
+from voice.vad import create_vad
+from voice.endpointer import Endpointer, EndpointPolicy
+from voice.backpressure import BackpressureSender
+from voice.level_meter import LevelMeter
+from voice.audio_source import MicSource, FileSource, SharedInputStream
+import time
 from multiprocessing import Queue
-import webrtcvad
 import datetime
 from settings import cfg
 from utils.resource_path import get_webrtc_apm_lib
 class VoiceRecorder:
-    def __init__(self, audio_queue: Queue, audio_send):
+    def __init__(self, audio_queue: Queue, audio_send, audio_stats=None,
+                 stream_id=None, speaker_recognizer=None):
+        """
+        Args:
+            stream_id: 多诊室录音时的音频流标识，随语音段送入 audio_queue；单路为 None
+            speaker_recognizer: 多路共用的声纹识别器，为 None 时自行加载
+        """
         self.sample_rate = 16000
         self.audio_queue = audio_queue
+        self.stream_id = stream_id
+        # audio_queue 背压：积压/丢弃/合并策略和计数
+        self._sender = BackpressureSender(
+            audio_queue,
+            maxsize=cfg.get("process", "audio_queue_size", 100),
+            stats=audio_stats,
+            policy=cfg.get("process", "backpressure_policy", "drop_oldest"),
+            backlog_size=cfg.get("process", "backlog_size", 20),
+            high_watermark=cfg.get("process", "high_watermark", 0.8),
+            stream_id=stream_id,
+        )
         self.audio_send = audio_send
+        self.source = None
+        # 波形显示只发送 10ms 粒度的 RMS/峰值包络
+        self._level_meter = LevelMeter(self._send_level) if audio_send else None
         self.audio_frames = []
-        self.resample_buffer = np.array([], dtype=np.int16)
+        # 采集缓冲：回调块(1600) + 上次不足一帧的余量
+        self.resample_buffer = RingBuffer(4096)
         self.apm = WebRtcApmLite(get_webrtc_apm_lib(),16000)
+        # APM 块处理的输出缓冲，容量与采集缓冲一致
+        self._ns_out = np.zeros(self.resample_buffer.capacity, dtype=np.int16)
 
         self._inner_queue = queue.Queue(maxsize=200)
         self._inner_thread = None
         self._inner_stop_event= threading.Event()
         
-        self.vad = webrtcvad.Vad(1)
+        self.vad_mode = cfg.get("asr", "vad_mode", "webrtc")
+        self.vad = create_vad(self.vad_mode, cfg.get("asr", "vad_aggressiveness", 1), 16000)
         self.frame_len = 160  # 10ms @ 16kHz
-        self.max_segment_len = 16000 * 1  # 15秒
+        # 端点检测：动态静音阈值 + 最大段长切分 + 预滚
+        # 只有流式 paraformer（funasr/onnx）需要在语音持续期间按块送出
+        streaming_asr = cfg.get("asr", "model") in ("funasr", "onnx") and cfg.get("asr", "streaming", True)
+        self._endpointer = Endpointer(EndpointPolicy.from_cfg(cfg.get("endpoint")), 16000,
+                                      streaming=streaming_asr)
 
-        #保存30s的wav文件
+        #流式保存wav文件
         self._save_queue = queue.Queue(maxsize=300)
         self._save_thread = None
         self._save_stop_event= threading.Event()
 
         # 声纹识别器（单例模式，仅加载一次）
-        self._speaker_recognizer = None
+        self._speaker_recognizer = speaker_recognizer
         self._reference_embeddings = None
-        self._init_speaker_recognizer()
+        if speaker_recognizer is None:
+            self._init_speaker_recognizer()
+        # 声纹识别放到后台线程，按序号回填说话人后再送入 audio_queue
+        self._speaker_tagger = SpeakerTagger(
+            self.identify_speaker_from_audio, self._sender.send,
+            skip_fn=self._sender.degrade_speaker_id,
+        )
+
+        # 丢帧统计：回调队列满时丢弃的采集块数
+        self.dropped_frames = 0
        
     def is_speech(self, frame):
         if len(frame) != 160:
             return False
-        return self.vad.is_speech(frame.tobytes(), 16000)
+        return bool(self.vad.classify(frame)[0])
 
     def _init_speaker_recognizer(self):
         """初始化声纹识别器（仅一次）"""
@@ -56,12 +99,20 @@ class VoiceRecorder:
             logger.error(f"初始化声纹识别器失败: {e}")
             self._speaker_recognizer = None
 
+    def _blocking_callback(self, indata, frames, time, status):
+        try:
+            self._inner_queue.put(indata[:, 0].copy(), timeout=5)
+        except queue.Full:
+            self.dropped_frames += 1
+            logger.warning(f"audio queue full, drop frame (total {self.dropped_frames})")
+
     def audio_callback(self, indata, frames, time, status):
         try:
             mic_int16 = indata[:, 0].copy()
             self._inner_queue.put_nowait(mic_int16)
         except queue.Full:
-            logger.warning("audio queue full, drop frame")
+            self.dropped_frames += 1
+            logger.warning(f"audio queue full, drop frame (total {self.dropped_frames})")
         except Exception as e:
             logger.error(f"audio_callback error: {e}")
 
@@ -114,174 +165,207 @@ class VoiceRecorder:
             logger.error(traceback.format_exc())
             return "用户", None
 
+    def _send_level(self, envelope):
+        try:
+            self.audio_send.send(envelope)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def _emit_segment(self, seg):
+        """提交端点检测输出的语音段：声纹识别 -> audio_queue，同时归档"""
+        seq = self._speaker_tagger.submit(seg.audio, seg.is_final)
+        logger.debug(f"提交语音段 #{seq}，[{seg.start}, {seg.end})，final: {seg.is_final}")
+        if len(seg.audio):
+            self._save_queue.put_nowait(seg.audio)
+
     def _inner_run(self):
-        bs = 160   
-        ns_chunks = []
-        silence_count = 0
+        bs = 160
+        self.resample_buffer.clear()
+        self._endpointer.reset()
         while not self._inner_stop_event.is_set():
             try:
                 block = self._inner_queue.get(timeout=0.1)
             except queue.Empty:
+                self._sender.drain()
                 continue
             except Exception as e:
                 logger.error(f"Error in audio processing: {e}")
 
-            self.resample_buffer = np.concatenate([self.resample_buffer, block])
+            self._sender.drain()
+            if self.resample_buffer.write(block) < len(block):
+                logger.warning("resample buffer full, drop samples")
             if len(self.resample_buffer) < 800:
                 continue
 
-            num_complete = len(self.resample_buffer) // bs * bs
-            chunks = self.resample_buffer[:num_complete]
-            self.resample_buffer = self.resample_buffer[num_complete:]
-
             try:
-                for i in range(0, len(chunks) - bs + 1, bs):
-                    segment = chunks[i : i + bs]
-                    ns_chunk = self.apm.process(segment)
-                    # logger.debug(f"apm处理音频段，长度: {len(ns_chunk)} samples")
-                    # webrtcvad 需要16-bit mono PCM 16kHz，且frame长度必须是10,20或30ms，这里用10ms
-                    # if self.sample_rate != 16000:
-                    #     float_data = ns_chunk.astype(np.float32) / 32768.0
-                    #     segment_16k = resampy.resample(float_data, 48000, 16000)
-                    #     ns_chunk = np.clip(segment_16k * 32768, -32768, 32767).astype(np.int16)
-                    if self.is_speech(ns_chunk):
-                        ns_chunks.append(ns_chunk)
-                        silence_count = 0
-                        if len(ns_chunks) * self.frame_len >= self.max_segment_len:
-                            ns_block = np.concatenate(ns_chunks)
-                            # 进行声纹识别
-                            speaker, similarity = self.identify_speaker_from_audio(ns_block)
-                            # 将说话人信息也放入队列
-                            self.audio_queue.put_nowait((ns_block.copy(), False, speaker))
-                            self._save_queue.put_nowait(ns_block.copy())
-                            ns_chunks.clear()
-                            logger.debug(f"语音段超长，送入queue，长度: {len(ns_block)}，说话人: {speaker}")
-                            # 发送波形数据到UI
-                            if self.audio_send:
-                                try:
-                                    self.audio_send.send(ns_block.copy())
-                                except (BrokenPipeError, OSError):
-                                    pass
-                    else:
-                        silence_count += 1
-                        if silence_count<10:
-                            continue
-                        if silence_count<20:
-                            if ns_chunks:
-                                ns_block = np.concatenate(ns_chunks)
-                                # 进行声纹识别
-                                speaker, similarity = self.identify_speaker_from_audio(ns_block)
-                                self.audio_queue.put_nowait((ns_block.copy(), False, speaker))
-                                self._save_queue.put_nowait(ns_block.copy())
-                                ns_chunks.clear()
-                                logger.debug(f"静音<20个或者语音段超长，送入queue，长度: {len(ns_block)}，说话人: {speaker}")
-                                # 发送波形数据到UI
-                                if self.audio_send:
-                                    try:
-                                        self.audio_send.send(ns_block.copy())
-                                    except (BrokenPipeError, OSError):
-                                        pass
-                            continue
-                            
-                        if silence_count >= 20:
-                            if ns_chunks:
-                                ns_block = np.concatenate(ns_chunks)
-                                # 进行声纹识别
-                                speaker, similarity = self.identify_speaker_from_audio(ns_block)
-                                self.audio_queue.put_nowait((ns_block.copy(), True, speaker))
-                                self._save_queue.put_nowait(ns_block.copy())
-                            else:
-                                self.audio_queue.put_nowait((ns_chunks.copy(), True, "用户"))
-                            logger.debug(f"静音>=20个或者语音段超长，送入queue，长度: {len(ns_block)}，说话人: {speaker if 'speaker' in locals() else '用户'}")
-                            ns_chunks.clear()
-                            silence_count = 0
-                            # 发送波形数据到UI（静音时也发送空数据让UI知道没有声音）
-                            if self.audio_send:
-                                try:
-                                    self.audio_send.send(np.array([], dtype=np.int16))
-                                except (BrokenPipeError, OSError):
-                                    pass
-                                
+                num_complete = len(self.resample_buffer) // bs * bs
+                chunks = self.resample_buffer.peek(num_complete)
+                self.resample_buffer.advance(num_complete)
+                ns_chunks_all = self.apm.process_block(chunks, self._ns_out)
+                if self._level_meter is not None:
+                    self._level_meter.update(ns_chunks_all)
+                # 整块一次判定，每 10ms 帧一个结果
+                speech_flags = self.vad.classify(ns_chunks_all)
+                for seg in self._endpointer.process(ns_chunks_all, speech_flags):
+                    self._emit_segment(seg)
             except (BrokenPipeError, EOFError) as e:
                 logger.warning(f"audio_send failed: {e}")
             except queue.Full:
-                logger.warning("audio_queue is full, dropping frame")
+                logger.warning("save queue is full, dropping frame")
             except Exception as e:
                 logger.error(f"Error in audio processing: {e}")
     def _save_run(self):
-        buff = np.array([], dtype=np.int16)
         save_dir = cfg.get("app", "save_dir")
 
         # 如果没有设置save_dir，不保存音频文件
         if not save_dir:
             logger.warning("未设置保存路径，跳过音频文件保存")
 
-        while not self._save_stop_event.is_set():
+        writer = None
+        if save_dir:
+            writer = create_archive_writer(
+                cfg.get("archive", "format", "opus"),
+                save_dir,
+                sample_rate=16000,
+                rotate_seconds=cfg.get("archive", "rotate_seconds", 1800),
+                rotate_bytes=cfg.get("archive", "rotate_mb", 200) * 1024 * 1024,
+                stream_id=self.stream_id,
+            )
+            from case.sql_manage import VedisManager
+
+        last_flush = datetime.datetime.now()
+        # 停止后继续把队列里剩余的语音段写完
+        while not self._save_stop_event.is_set() or not self._save_queue.empty():
             try:
                 block = self._save_queue.get(timeout=0.1)
             except queue.Empty:
+                if writer is not None and (datetime.datetime.now() - last_flush).total_seconds() >= 5:
+                    writer.flush()
+                    last_flush = datetime.datetime.now()
                 continue
             except Exception as e:
                 logger.error(f"Error in audio processing: {e}")
-
-            buff = np.concatenate([buff, block])
-            if len(buff) < 480000:
                 continue
 
-            # 只有在设置了save_dir的情况下才保存文件
-            if not save_dir:
-                logger.info(f"跳过保存音频数据（长度: {len(buff)} samples）")
-                buff = np.array([], dtype=np.int16)
+            if writer is None:
                 continue
+            try:
+                writer.write(block, VedisManager.get("current_case_id"))
+                if (datetime.datetime.now() - last_flush).total_seconds() >= 5:
+                    writer.flush()
+                    last_flush = datetime.datetime.now()
+            except Exception as e:
+                logger.error(f"写入WAV失败: {e}")
 
-            from case.sql_manage import VedisManager
-
-            case_id=VedisManager.get("current_case_id")
-            now_str = datetime.datetime.now().strftime("%H%M%S")
-
-            import os
-            os.makedirs(os.path.join(save_dir, "wav"), exist_ok=True)
-            filepath = os.path.join(save_dir, f"wav/{case_id}_{now_str}.wav")
-            with wave.open(filepath, 'wb') as wf:
-                wf.setnchannels(1)
-                wf.setsampwidth(np.dtype('int16').itemsize)
-                wf.setframerate(16000)
-                wf.writeframes(b''.join([f.tobytes() for f in buff]))
-
-            logger.info(f"Saved WAV to {filepath}")
-            buff = np.array([], dtype=np.int16)
+        if writer is not None:
+            writer.close()
 
-    def start(self, device=None):
-        logger.info("打开麦克风录音...")
+    def start(self, device=None, source=None):
+        """
+        Args:
+            device: 麦克风设备编号（source 为空时使用）
+            source: 可选的音频源（如 FileSource），默认打开麦克风
+        """
+        self.source = source if source is not None else MicSource(device)
+        logger.info(f"打开音频源: {type(self.source).__name__}")
         self._inner_stop_event.clear()
+        self._save_stop_event.clear()
+        self.dropped_frames = 0
+        self._speaker_tagger.start()
 
         self._inner_thread = threading.Thread(target=self._inner_run,daemon=True)
         self._inner_thread.start()
         self._save_thread= threading.Thread(target=self._save_run, daemon=True)
         self._save_thread.start()
 
-        self.stream = sd.InputStream(
-            samplerate=16000,
-            channels=1,
-            dtype='int16',
-            callback=self.audio_callback,
-            blocksize=1600,
-            device=device
-        )
-        self.stream.start()
-        logger.info("麦克风成功打开")
+        # 非实时源（文件快速回放）阻塞等待处理线程，不丢帧
+        callback = self.audio_callback if self.source.realtime else self._blocking_callback
+        self.source.start(callback)
+        logger.info("音频源成功打开")
 
-    def stop(self):
+    def stop(self, drain: bool = False, timeout: float = 30):
+        """
+        Args:
+            drain: 为 True 时先等处理线程把已采集的数据处理完（文件回放用）
+            timeout: drain 的最长等待时间
+        """
         logger.info("停止麦克风录音...")
         try:
-            self.stream.stop()
-            self.stream.close()
+            if self.source is not None:
+                self.source.stop()
         except Exception as e:
             logger.error(f"stream stop close error: {e}")
+        if drain:
+            deadline = time.monotonic() + timeout
+            while not self._inner_queue.empty() and time.monotonic() < deadline:
+                time.sleep(0.01)
         self._inner_stop_event.set()
         if self._inner_thread is not None:
             self._inner_thread.join(timeout=2)
             logger.info("音频处理线程已退出")
+        try:
+            for seg in self._endpointer.flush():
+                self._emit_segment(seg)
+        except queue.Full:
+            logger.warning("save queue is full, dropping tail segment")
+        if self._level_meter is not None:
+            self._level_meter.reset()
+        self._speaker_tagger.stop()
+        self._sender.close()
+        self._save_stop_event.set()
+        if self._save_thread is not None:
+            self._save_thread.join(timeout=5)
+            logger.info("音频保存线程已退出")
+        logger.info(f"本次录音丢弃采集帧: {self.dropped_frames}，"
+                    f"跳过声纹识别段: {self._speaker_tagger.skipped}，"
+                    f"发送失败段: {self._speaker_tagger.emit_failed}，"
+                    f"audio_queue 统计: {self._sender.stats.snapshot()}")
+
+class MultiRoomRecorder:
+    """
+    多诊室录音：每个输入设备/声道一个 VoiceRecorder，各自独立的 APM、VAD 和端点状态，
+    语音段带 stream_id 送入同一个 audio_queue，由一个 ASR 进程识别，模型只加载一份。
+    rooms 配置形如 [{"id": "诊室1", "device": 1, "channel": 0}, ...]
+    """
+
+    def __init__(self, audio_queue: Queue, audio_send, audio_stats, rooms: list):
+        self.rooms = rooms
+        self.recorders = []
+        # 同一设备的多个诊室共用一个输入流，设备只打开一次，声道数取各诊室所需的最大值
+        self.devices = {}
+        for room in rooms:
+            device = room.get("device")
+            channels = room.get("channel", 0) + 1
+            if device not in self.devices:
+                self.devices[device] = SharedInputStream(device, channels)
+            else:
+                self.devices[device].channels = max(self.devices[device].channels, channels)
+        speaker_recognizer = None
+        for i, room in enumerate(rooms):
+            recorder = VoiceRecorder(
+                audio_queue,
+                # 波形只显示第一路
+                audio_send if i == 0 else None,
+                audio_stats,
+                stream_id=room.get("id", str(i)),
+                speaker_recognizer=speaker_recognizer,
+            )
+            speaker_recognizer = recorder._speaker_recognizer
+            self.recorders.append(recorder)
+        logger.info(f"多诊室录音: {[r.stream_id for r in self.recorders]}")
+
+    def start(self):
+        for room, recorder in zip(self.rooms, self.recorders):
+            recorder.start(source=MicSource(room.get("device"), channel=room.get("channel", 0),
+                                            shared=self.devices[room.get("device")]))
+
+    def stop(self):
+        for recorder in self.recorders:
+            try:
+                recorder.stop()
+            except Exception as e:
+                logger.error(f"停止 {recorder.stream_id} 录音失败: {e}")
+
 
 def run(kwargs):
     from utils.loger_util import init_subprocess_logger
@@ -290,8 +374,13 @@ def run(kwargs):
     control_queue = kwargs['control_queue']
     audio_queue: Queue = kwargs['audio_queue']
     audio_send = kwargs.get('audio_send', None)
+    audio_stats = kwargs.get('audio_stats', None)
 
-    recorder = VoiceRecorder(audio_queue, audio_send)
+    rooms = cfg.get("input_device", "rooms", [])
+    if rooms:
+        recorder = MultiRoomRecorder(audio_queue, audio_send, audio_stats, rooms)
+    else:
+        recorder = VoiceRecorder(audio_queue, audio_send, audio_stats)
 
     logger.info("🎙️ Recorder 进程初始化完成，等待控制命令...")
     
@@ -303,6 +392,10 @@ def run(kwargs):
             if cmd == 'start':
                 recorder.start()
                 logger.info("✅ 录音已启动")
+            elif isinstance(cmd, dict) and cmd.get('cmd') == 'replay' and isinstance(recorder, VoiceRecorder):
+                # 回放录音文件：{'cmd': 'replay', 'path': ..., 'realtime': True}
+                recorder.start(source=FileSource(cmd['path'], realtime=cmd.get('realtime', True)))
+                logger.info(f"✅ 开始回放: {cmd['path']}")
             elif cmd == 'stop':
                 recorder.stop()
                 logger.info("✅ 录音已停止")
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+固定容量 int16 环形缓冲区
+录音线程的热路径只在初始化时分配一次内存，之后读写都在同一块 ndarray 上完成
+"""
+import numpy as np
+
+
+class RingBuffer:
+    """单生产者/单消费者的 int16 环形缓冲区（容量为 2 的幂）"""
+
+    def __init__(self, capacity: int, dtype=np.int16):
+        """
+        Args:
+            capacity: 期望容量（样本数），会向上取整到 2 的幂
+            dtype: 元素类型，默认 int16
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self.capacity = size
+        self._mask = size - 1
+        self._buf = np.zeros(size, dtype=dtype)
+        # 跨越尾部时 peek 使用的暂存区，避免每次拼接都新分配
+        self._scratch = np.zeros(size, dtype=dtype)
+        # 读写游标单调递增，取模后才是物理位置
+        self._read = 0
+        self._write = 0
+
+    def __len__(self):
+        return self._write - self._read
+
+    @property
+    def free(self) -> int:
+        return self.capacity - len(self)
+
+    def write(self, data: np.ndarray) -> int:
+        """
+        写入数据，空间不足时只写入能放下的部分
+
+        Returns:
+            实际写入的样本数
+        """
+        n = min(len(data), self.free)
+        if n <= 0:
+            return 0
+        start = self._write & self._mask
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = data[:first]
+        if n > first:
+            self._buf[:n - first] = data[first:n]
+        self._write += n
+        return n
+
+    def contiguous(self) -> int:
+        """读游标处可以零拷贝读取的连续样本数"""
+        start = self._read & self._mask
+        return min(len(self), self.capacity - start)
+
+    def view(self, n: int = None) -> np.ndarray:
+        """
+        返回读游标处连续数据的零拷贝视图（不移动游标）
+        n 超过连续长度时截断，调用方可结合 contiguous() 判断
+        """
+        start = self._read & self._mask
+        avail = self.contiguous()
+        n = avail if n is None else min(n, avail)
+        return self._buf[start:start + n]
+
+    def peek(self, n: int) -> np.ndarray:
+        """
+        读取 n 个样本但不移动游标
+        数据连续时返回视图，跨越尾部时拷贝到内部暂存区后返回其视图；
+        返回值在下一次 peek/write 之前有效
+        """
+        if n > len(self):
+            raise ValueError(f"peek {n} samples, only {len(self)} available")
+        if n <= self.contiguous():
+            return self.view(n)
+        first = self.contiguous()
+        start = self._read & self._mask
+        self._scratch[:first] = self._buf[start:start + first]
+        self._scratch[first:n] = self._buf[:n - first]
+        return self._scratch[:n]
+
+    def advance(self, n: int):
+        """移动读游标，丢弃 n 个样本"""
+        if n > len(self):
+            raise ValueError(f"advance {n} samples, only {len(self)} available")
+        self._read += n
+
+    def read_into(self, out: np.ndarray) -> int:
+        """读取数据到调用方提供的数组中，返回读取的样本数"""
+        n = min(len(out), len(self))
+        out[:n] = self.peek(n)
+        self.advance(n)
+        return n
+
+    def clear(self):
+        """清空缓冲区；游标归零，之后写入的数据从头部开始且保证连续"""
+        self._read = 0
+        self._write = 0
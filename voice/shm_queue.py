@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+共享内存音频队列：RecorderProcess -> ASRProcess
+音频样本写入 multiprocessing.shared_memory 环形区，队列里只传 (偏移, 长度, is_final, speaker) 描述符，
+样本本身不经过 pickle。接口与 multiprocessing.Queue 的 put_nowait/get 保持一致，可直接替换 audio_queue。
+支持多生产者（多诊室各自的发送线程，写入环形区和描述符入队在同一把锁内完成，保证顺序一致），单消费者。
+"""
+import queue
+import time
+from multiprocessing import Lock, Queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 头部两个 int64：写游标、读游标（单调递增的样本计数）
+_HEADER_BYTES = 16
+
+
+class SharedAudioQueue:
+    def __init__(self, capacity: int = 16000 * 60, maxsize: int = 100):
+        """
+        Args:
+            capacity: 环形区容量（int16 样本数）
+            maxsize: 描述符队列长度，对应原 audio_queue_size
+        """
+        self.capacity = int(capacity)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=_HEADER_BYTES + self.capacity * 2
+        )
+        self._owner = True
+        self._desc_queue = Queue(maxsize=maxsize)
+        # 写游标、样本写入和描述符入队必须原子完成，否则多个生产者会互相覆盖
+        self._write_lock = Lock()
+        self._attach()
+        self._cursors[:] = 0
+
+    def _attach(self):
+        buf = self._shm.buf
+        self._cursors = np.ndarray((2,), dtype=np.int64, buffer=buf[:_HEADER_BYTES])
+        self._ring = np.ndarray((self.capacity,), dtype=np.int16, buffer=buf[_HEADER_BYTES:])
+
+    def __getstate__(self):
+        # 子进程按名字重新挂载共享内存，numpy 视图不参与序列化
+        return {
+            "capacity": self.capacity,
+            "shm": self._shm,
+            "desc_queue": self._desc_queue,
+            "write_lock": self._write_lock,
+        }
+
+    def __setstate__(self, state):
+        self.capacity = state["capacity"]
+        self._shm = state["shm"]
+        self._desc_queue = state["desc_queue"]
+        self._write_lock = state["write_lock"]
+        self._owner = False
+        self._attach()
+
+    # ================= 生产者 =================
+
+    def put_nowait(self, item):
+        """
+        写入 (audio, is_final, speaker[, stream_id])
+        环形区或描述符队列已满时抛出 queue.Full，与 Queue.put_nowait 一致
+        """
+        audio, *meta = item
+        audio = np.asarray(audio, dtype=np.int16)
+        n = len(audio)
+        with self._write_lock:
+            write, read = int(self._cursors[0]), int(self._cursors[1])
+            if n > self.capacity - (write - read):
+                raise queue.Full
+            start = write % self.capacity
+            first = min(n, self.capacity - start)
+            self._ring[start:start + first] = audio[:first]
+            if n > first:
+                self._ring[:n - first] = audio[first:]
+            # 描述符入队成功后才提交写游标，失败时这段数据会被下次写入覆盖
+            self._desc_queue.put_nowait((write, n, *meta))
+            self._cursors[0] = write + n
+
+    def put(self, item, block=True, timeout=None):
+        """
+        与 Queue.put 一致：block=True 时等待环形区/描述符队列腾出空间，
+        timeout 秒后仍满则抛出 queue.Full；timeout=None 一直等待
+        """
+        if not block:
+            return self.put_nowait(item)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.put_nowait(item)
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.005)
+
+    # ================= 消费者 =================
+
+    def get(self, block=True, timeout=None):
+        """取出 (audio, is_final, speaker[, stream_id])，audio 为从共享内存拷出的独立数组"""
+        offset, n, *meta = self._desc_queue.get(block, timeout)
+        audio = np.empty(n, dtype=np.int16)
+        start = offset % self.capacity
+        first = min(n, self.capacity - start)
+        audio[:first] = self._ring[start:start + first]
+        if n > first:
+            audio[first:] = self._ring[:n - first]
+        self._cursors[1] = offset + n
+        return (audio, *meta)
+
+    def get_nowait(self):
+        return self.get(False)
+
+    def empty(self):
+        return self._desc_queue.empty()
+
+    def qsize(self):
+        return self._desc_queue.qsize()
+
+    def close(self):
+        """释放共享内存；创建方负责 unlink"""
+        self._cursors = None
+        self._ring = None
+        try:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+        except (FileNotFoundError, BufferError):
+            pass
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+异步说话人打标签
+录音线程只负责提交语音段并拿到序号，声纹识别在后台线程完成后按序号回填说话人，
+再按提交顺序把语音段交给下游，录音/APM 循环不会被 MFCC/torch 计算阻塞。
+声纹识别按整句进行：句中片段（非 final）沿用上一句的说话人直接发出，
+final 时对整句音频（最长 MAX_IDENTIFY_SECONDS）识别一次。
+"""
+import queue
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from loguru import logger
+
+DEFAULT_SPEAKER = "用户"
+MAX_IDENTIFY_SECONDS = 15
+
+
+class SpeakerTagger:
+    def __init__(self, identify_fn, emit_fn, max_pending: int = 8, skip_fn=None, sample_rate: int = 16000):
+        """
+        Args:
+            identify_fn: audio -> (speaker, similarity)，在后台线程调用
+            emit_fn: (audio, is_final, speaker) -> None，按提交顺序调用
+            max_pending: 等待识别的语音段上限，超过后新段跳过声纹识别
+            skip_fn: 可选，返回 True 时本段跳过声纹识别（下游积压时降载）
+        """
+        self.identify_fn = identify_fn
+        self.emit_fn = emit_fn
+        self.skip_fn = skip_fn
+        self._jobs = queue.Queue(maxsize=max_pending)
+        # seq -> [audio, is_final, speaker]，speaker 为 None 表示尚未识别
+        self._pending = OrderedDict()
+        # seq -> 用于声纹识别的整句音频；当前句已提交的片段
+        self._identify_audio = {}
+        self._utterance = []
+        self.max_identify_len = MAX_IDENTIFY_SECONDS * sample_rate
+        self.last_speaker = DEFAULT_SPEAKER
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        # 统计
+        self.skipped = 0
+        self.emit_failed = 0
+
+    def start(self):
+        self._stop_event.clear()
+        self.skipped = 0
+        self.emit_failed = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2):
+        """停止后台线程，未识别完的语音段按默认说话人发出"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        with self._lock:
+            for item in self._pending.values():
+                if item[2] is None:
+                    item[2] = DEFAULT_SPEAKER
+            self._identify_audio.clear()
+            self._utterance = []
+        self._flush()
+
+    def submit(self, audio, is_final: bool) -> int:
+        """
+        提交一个语音段（不阻塞），返回其序号
+        audio 会被后台线程持有，调用方需传入独立的数组
+        """
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._pending[seq] = [audio, is_final, None]
+            if len(audio):
+                self._utterance.append(audio)
+            if is_final:
+                utterance = np.concatenate(self._utterance) if self._utterance else audio
+                self._utterance = []
+        if not is_final:
+            # 句中片段不做声纹识别，沿用上一句的说话人，整句说话人在 final 时识别
+            self._set_speaker(seq, self.last_speaker)
+            return seq
+        utterance = utterance[-self.max_identify_len:]
+        if len(utterance) == 0 or (self.skip_fn is not None and self.skip_fn()):
+            self._set_speaker(seq, DEFAULT_SPEAKER)
+            return seq
+        with self._lock:
+            self._identify_audio[seq] = utterance
+        try:
+            self._jobs.put_nowait(seq)
+        except queue.Full:
+            with self._lock:
+                self._identify_audio.pop(seq, None)
+            # 识别线程跟不上时跳过本段识别，由 ASR 侧再做声纹确认
+            self.skipped += 1
+            logger.debug(f"声纹识别积压，跳过语音段 #{seq}")
+            self._set_speaker(seq, DEFAULT_SPEAKER)
+        return seq
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                seq = self._jobs.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                audio = self._identify_audio.pop(seq, None)
+            if audio is None:
+                continue
+            try:
+                speaker, _ = self.identify_fn(audio)
+            except Exception as e:
+                logger.error(f"声纹识别线程异常: {e}")
+                speaker = DEFAULT_SPEAKER
+            self.last_speaker = speaker or DEFAULT_SPEAKER
+            self._set_speaker(seq, self.last_speaker)
+
+    def _set_speaker(self, seq: int, speaker: str):
+        with self._lock:
+            item = self._pending.get(seq)
+            if item is not None:
+                item[2] = speaker
+        self._flush()
+
+    def _flush(self):
+        """按序号顺序发出已经识别完的语音段"""
+        with self._lock:
+            while self._pending:
+                seq, item = next(iter(self._pending.items()))
+                if item[2] is None:
+                    break
+                self._pending.popitem(last=False)
+                audio, is_final, speaker = item
+                try:
+                    self.emit_fn(audio, is_final, speaker)
+                except queue.Full:
+                    self.emit_failed += 1
+                    logger.warning(f"audio_queue is full, dropping segment #{seq}")
+                except Exception as e:
+                    self.emit_failed += 1
+                    logger.error(f"语音段 #{seq} 发送失败: {e}")
+                else:
+                    logger.debug(f"语音段 #{seq} 送入queue，长度: {len(audio)}，说话人: {speaker}")
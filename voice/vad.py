@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+VAD 引擎
+统一接口 classify(block) -> 每 10ms 帧一个布尔值，一次调用处理整块（如 100ms）音频。
+  webrtc: 逐帧调用 webrtcvad（原实现）
+  energy: NumPy 向量化的能量 + 过零率门限，整块一次计算
+  hybrid: 先走能量门限，只有门限无法判定的帧才调用 webrtcvad
+通过 cfg asr.vad_mode 选择。
+"""
+import numpy as np
+
+FRAME_LEN = 160  # 10ms @ 16kHz
+
+
+def _frames(block: np.ndarray) -> np.ndarray:
+    n = len(block) // FRAME_LEN
+    return block[:n * FRAME_LEN].reshape(n, FRAME_LEN)
+
+
+class WebRtcVad:
+    """逐帧 webrtcvad"""
+
+    def __init__(self, aggressiveness: int = 1, sample_rate: int = 16000):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        if len(frame) != FRAME_LEN:
+            return False
+        return self.vad.is_speech(frame.tobytes(), self.sample_rate)
+
+    def classify(self, block: np.ndarray) -> np.ndarray:
+        frames = _frames(block)
+        return np.fromiter((self.is_speech(f) for f in frames), dtype=bool, count=len(frames))
+
+
+class EnergyVad:
+    """向量化能量/过零率门限"""
+
+    def __init__(self, speech_db: float = -35.0, silence_db: float = -55.0, max_zcr: float = 0.25):
+        """
+        Args:
+            speech_db: 高于此能量（dBFS）且过零率低的帧直接判为语音
+            silence_db: 低于此能量（dBFS）的帧直接判为静音
+            max_zcr: 语音帧允许的最大过零率（每样本），过高多为噪声/摩擦音
+        """
+        self.speech_db = speech_db
+        self.silence_db = silence_db
+        self.max_zcr = max_zcr
+
+    def features(self, block: np.ndarray):
+        """返回每帧 (能量 dBFS, 过零率)"""
+        frames = _frames(block).astype(np.float32)
+        power = np.mean(frames * frames, axis=1) / (32768.0 * 32768.0)
+        energy_db = 10.0 * np.log10(power + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (FRAME_LEN - 1)
+        return energy_db, zcr
+
+    def gate(self, block: np.ndarray):
+        """
+        三态判定
+
+        Returns:
+            (speech, undecided) 两个布尔数组；两者都为 False 的帧是静音
+        """
+        energy_db, zcr = self.features(block)
+        speech = (energy_db >= self.speech_db) & (zcr <= self.max_zcr)
+        silence = energy_db < self.silence_db
+        undecided = ~(speech | silence)
+        return speech, undecided
+
+    def classify(self, block: np.ndarray) -> np.ndarray:
+        energy_db, zcr = self.features(block)
+        threshold = (self.speech_db + self.silence_db) / 2
+        return (energy_db >= threshold) & (zcr <= self.max_zcr)
+
+
+class HybridVad:
+    """能量门限预判，webrtcvad 只处理无法判定的帧"""
+
+    def __init__(self, aggressiveness: int = 1, sample_rate: int = 16000, **energy_kwargs):
+        self.gate = EnergyVad(**energy_kwargs)
+        self.webrtc = WebRtcVad(aggressiveness, sample_rate)
+
+    def classify(self, block: np.ndarray) -> np.ndarray:
+        speech, undecided = self.gate.gate(block)
+        if undecided.any():
+            frames = _frames(block)
+            for i in np.flatnonzero(undecided):
+                speech[i] = self.webrtc.is_speech(frames[i])
+        return speech
+
+
+VAD_MODES = ("webrtc", "energy", "hybrid")
+
+
+def create_vad(mode: str = "webrtc", aggressiveness: int = 1, sample_rate: int = 16000):
+    """按模式名创建 VAD 引擎，未知模式回退到 webrtc"""
+    if mode == "energy":
+        return EnergyVad()
+    if mode == "hybrid":
+        return HybridVad(aggressiveness, sample_rate)
+    return WebRtcVad(aggressiveness, sample_rate)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+流式 WAV 归档
+每个病例会话保持一个打开的文件，语音段到达即追加写入；flush 时回填 RIFF 头中的长度字段，
+按时长或文件大小轮转。内存占用恒定，停止录音时剩余数据不会丢失。
+"""
+import datetime
+import os
+import struct
+
+import numpy as np
+from loguru import logger
+
+_HEADER_BYTES = 44
+
+
+def _wav_header(data_bytes: int, sample_rate: int, channels: int = 1, sampwidth: int = 2) -> bytes:
+    byte_rate = sample_rate * channels * sampwidth
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, byte_rate, channels * sampwidth, sampwidth * 8,
+        b"data", data_bytes,
+    )
+
+
+class WavArchiveWriter:
+    suffix = "wav"
+
+    def __init__(self, save_dir: str, sample_rate: int = 16000,
+                 rotate_seconds: float = 1800, rotate_bytes: int = 200 * 1024 * 1024,
+                 stream_id=None):
+        """
+        Args:
+            save_dir: 保存根目录，文件写入 save_dir/wav
+            sample_rate: 采样率（单声道 int16）
+            rotate_seconds: 单个文件的最长时长，超过后新开文件
+            rotate_bytes: 单个文件的最大字节数（含头部）
+            stream_id: 多路录音时写入文件名，避免各诊室文件重名
+        """
+        self.wav_dir = os.path.join(save_dir, "wav")
+        self.sample_rate = sample_rate
+        self.rotate_samples = int(rotate_seconds * sample_rate)
+        self.rotate_bytes = int(rotate_bytes)
+        self.stream_id = stream_id
+        self._file = None
+        self._case_id = None
+        self._data_bytes = 0
+        self._flushed_bytes = 0
+        self.filepath = None
+
+    def _open(self, case_id):
+        os.makedirs(self.wav_dir, exist_ok=True)
+        now_str = datetime.datetime.now().strftime("%H%M%S")
+        name = f"{case_id}_{now_str}" if self.stream_id is None else f"{case_id}_{self.stream_id}_{now_str}"
+        self.filepath = os.path.join(self.wav_dir, f"{name}.{self.suffix}")
+        self._open_file(self.filepath)
+        self._case_id = case_id
+        self._data_bytes = 0
+        self._flushed_bytes = 0
+        logger.info(f"开始写入 {self.suffix}: {self.filepath}")
+
+    # ================= 格式相关，子类覆盖 =================
+
+    def _open_file(self, path):
+        self._file = open(path, "wb")
+        self._file.write(_wav_header(0, self.sample_rate))
+
+    def _append(self, block: np.ndarray):
+        self._file.write(memoryview(block).cast("B"))
+
+    def _would_exceed(self, block: np.ndarray) -> bool:
+        return _HEADER_BYTES + self._data_bytes + block.nbytes > self.rotate_bytes
+
+    def _close_file(self):
+        self.flush()
+        self._file.close()
+
+    # ================= 对外接口 =================
+
+    def write(self, block: np.ndarray, case_id=None):
+        """追加一段 int16 音频；病例变化或达到轮转阈值时自动换文件"""
+        if self._file is not None and case_id != self._case_id:
+            self.close()
+        if self._file is None:
+            self._open(case_id)
+        elif self._data_bytes // 2 >= self.rotate_samples or self._would_exceed(block):
+            self.close()
+            self._open(case_id)
+        block = np.ascontiguousarray(block, dtype="<i2")
+        self._append(block)
+        self._data_bytes += block.nbytes
+
+    def flush(self):
+        """回填 RIFF/data 长度并刷盘，文件在任意 flush 之后都是合法的 WAV"""
+        if self._file is None or self._flushed_bytes == self._data_bytes:
+            return
+        f = self._file
+        f.seek(4)
+        f.write(struct.pack("<I", 36 + self._data_bytes))
+        f.seek(40)
+        f.write(struct.pack("<I", self._data_bytes))
+        f.seek(0, os.SEEK_END)
+        f.flush()
+        self._flushed_bytes = self._data_bytes
+
+    def close(self):
+        if self._file is None:
+            return
+        self._close_file()
+        self._file = None
+        logger.info(f"Saved {self.suffix} to {self.filepath} ({self._data_bytes / 2 / self.sample_rate:.1f}s)")
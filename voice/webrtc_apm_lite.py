@@ -140,6 +140,17 @@ class WebRtcApmLite:
         self.lib.WebRTC_APM_ProcessStream.argtypes = [c_void_p, POINTER(c_short), c_void_p, c_void_p, POINTER(c_short)]
         self.lib.WebRTC_APM_ProcessReverseStream.argtypes = [c_void_p, POINTER(c_short), c_void_p, c_void_p, POINTER(c_short)]
 
+        # 块处理用的原始地址版本：直接传整数地址，省去每帧构造 POINTER 对象
+        # lib[...] 每次返回新的函数对象，不影响上面 process 使用的 argtypes
+        self._process_raw = self.lib["WebRTC_APM_ProcessStream"]
+        self._process_raw.argtypes = [c_void_p, c_void_p, c_void_p, c_void_p, c_void_p]
+        self._process_raw.restype = c_int
+        self._reverse_raw = self.lib["WebRTC_APM_ProcessReverseStream"]
+        self._reverse_raw.argtypes = [c_void_p, c_void_p, c_void_p, c_void_p, c_void_p]
+        self._reverse_raw.restype = c_int
+        # 反向流的输出不使用，复用同一块暂存区
+        self._reverse_out = np.zeros(self.frame_size, dtype=np.int16)
+
     def set_config(self, enable_aec=True, enable_ns=True, ns_level=1, enable_agc=True):
         cfg = create_lite_config(self.sample_rate, enable_aec, enable_ns, ns_level, enable_agc)
         ret = self.lib.WebRTC_APM_ApplyConfig(self.apm, byref(cfg))
@@ -180,6 +191,45 @@ class WebRtcApmLite:
 
         return np.frombuffer(out_buf, dtype=np.int16).copy()
 
+    def process_block(self, mic_block: np.ndarray, out: np.ndarray, ref_block: np.ndarray = None) -> np.ndarray:
+        """
+        批量处理 N 帧音频，结果写入调用方预分配的 out 数组，不产生新的缓冲区。
+
+        Args:
+            mic_block: int16 麦克风数据，长度必须是 frame_size 的整数倍
+            out: int16 输出数组，长度不小于 mic_block
+            ref_block: 可选的 int16 参考信号（回声消除），长度与 mic_block 相同
+
+        Returns:
+            out 中与 mic_block 等长的视图
+        """
+        bs = self.frame_size
+        n = len(mic_block)
+        if n % bs != 0:
+            raise ValueError(f"block length {n} is not a multiple of {bs}")
+        if len(out) < n or out.dtype != np.int16 or not out.flags.c_contiguous:
+            raise ValueError("out must be a C-contiguous int16 array no shorter than mic_block")
+        mic_block = np.ascontiguousarray(mic_block, dtype=np.int16)
+        if ref_block is not None:
+            if len(ref_block) != n:
+                raise ValueError("ref_block must have the same length as mic_block")
+            ref_block = np.ascontiguousarray(ref_block, dtype=np.int16)
+
+        apm = self.apm
+        config = self.stream_config
+        step = bs * mic_block.itemsize
+        mic_addr = mic_block.ctypes.data
+        out_addr = out.ctypes.data
+        ref_addr = ref_block.ctypes.data if ref_block is not None else None
+        rev_addr = self._reverse_out.ctypes.data
+        for offset in range(0, n // bs * step, step):
+            if ref_addr is not None:
+                self._reverse_raw(apm, ref_addr + offset, config, config, rev_addr)
+            ret = self._process_raw(apm, mic_addr + offset, config, config, out_addr + offset)
+            if ret != 0:
+                logger.warning(f"ProcessStream failed: {ret}")
+        return out[:n]
+
     def close(self):
         if hasattr(self, "stream_config") and self.stream_config:
             self.lib.WebRTC_APM_DestroyStreamConfig(self.stream_config)